@@ -85,6 +85,26 @@ DATABASES = {
 }
 
 
+# Cache: Redis (shared by every worker process) when REDIS_URL is set,
+# otherwise process-local memory
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "ahyera-store",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -146,6 +166,97 @@ LOGIN_REDIRECT_URL = '/'
 MAX_NEGOTIATION_DISCOUNT = 0.20
 MAX_NEGOTIATION_ATTEMPTS = 3
 
+# Product search: maximum number of ranked hits taken from the full-text index
+SEARCH_MAX_RESULTS = 500
+# Seconds a facet count result stays cached (product changes invalidate it early)
+FACET_CACHE_TIMEOUT = 300
+
+# Seconds before the in-process typeahead index is rebuilt from the database
+AUTOCOMPLETE_REFRESH_SECONDS = 600
+
+# Local visual search (services.image_index_service)
+VISUAL_INDEX_DIR = BASE_DIR / 'var' / 'visual_index'
+VISUAL_INDEX_REBUILD_INTERVAL = 60  # min seconds between matrix rebuilds
+VISUAL_SEARCH_MIN_SIMILARITY = 0.5
+# Re-rank visual matches with the Groq vision description (one remote call per search)
+VISUAL_SEARCH_LLM_RERANK = config('VISUAL_SEARCH_LLM_RERANK', default=False, cast=bool)
+# End-to-end budget for one vision description call, retries included (seconds)
+VISUAL_SEARCH_LATENCY_BUDGET = config('VISUAL_SEARCH_LATENCY_BUDGET', default=20.0, cast=float)
+# Shared HTTP client for LLM APIs: pool size, retries on 429/5xx and
+# connection errors, and (connect, read) timeouts per endpoint
+LLM_HTTP_POOL_SIZE = 10
+LLM_HTTP_RETRIES = 2
+LLM_HTTP_BACKOFF = 0.5
+LLM_HTTP_MAX_RETRY_DELAY = 10  # upper bound on any retry wait, incl. Retry-After
+LLM_HTTP_TIMEOUTS = {
+    'negotiation': (3.05, 15),
+    'vision': (3.05, 20),
+}
+# Negotiation LLM: end-to-end latency budget per offer (seconds) and the
+# circuit breaker that skips the call while the endpoint is failing or slow
+NEGOTIATION_LATENCY_BUDGET = config('NEGOTIATION_LATENCY_BUDGET', default=5.0, cast=float)
+NEGOTIATION_BREAKER_WINDOW = 20
+NEGOTIATION_BREAKER_MIN_CALLS = 5
+NEGOTIATION_BREAKER_FAILURE_RATE = 0.5
+NEGOTIATION_BREAKER_P95_LATENCY = 4.0
+NEGOTIATION_BREAKER_RESET_TIMEOUT = 30
+# Cached product id lists (guest recommendations, AI picks, trending): ids kept per
+# list, seconds a list is fresh, served stale while refreshing, and trusted
+# from the process-local copy without checking the shared cache
+PRODUCT_LIST_SIZE = 12
+PRODUCT_LIST_FRESH_TTL = 300
+PRODUCT_LIST_STALE_TTL = 3600
+PRODUCT_LIST_LOCAL_TTL = 10
+# Stored per-user recommendations: rows kept per user, and how long order or
+# wishlist changes are batched before that user's rows are recomputed
+RECOMMENDATION_STORE_SIZE = 12
+RECOMMENDATION_REFRESH_DELAY = 5
+# "Customers also bought" batch job (build_item_similarities): neighbours per
+# product, rows per sparse block, weight of a wishlist entry vs a purchase
+SIMILARITY_TOP_K = 20
+SIMILARITY_CHUNK_SIZE = 2000
+SIMILARITY_MIN_SCORE = 0.01
+SIMILARITY_WISHLIST_WEIGHT = 0.5
+# Trending products (compact_product_events): weight of each logged event,
+# half-life (seconds) of its contribution, scores below MIN_SCORE are dropped,
+# and how many available products get is_trending
+TRENDING_EVENT_WEIGHTS = {'order': 5.0, 'wishlist': 3.0, 'cart_add': 2.0, 'view': 0.2}
+TRENDING_HALF_LIFE = 24 * 3600
+TRENDING_MIN_SCORE = 0.05
+TRENDING_SIZE = 12
+# Remote (LLM) negotiation decisions run on a background thread pool while
+# the negotiate page polls; pending offers older than the timeout are re-queued
+NEGOTIATION_ASYNC = config('NEGOTIATION_ASYNC', default=True, cast=bool)
+NEGOTIATION_WORKERS = 4
+NEGOTIATION_PENDING_TIMEOUT = 30
+# Default negotiation strategy ('llm', 'concession' or 'time_decay'); sellers
+# and categories can override it. Concession curves go from the listed price
+# to the minimum: BETA < 1 holds out, > 1 concedes early; INITIAL is the
+# share of the discount offered straight away; HORIZON (seconds) is how long
+# 'time_decay' takes to reach the minimum.
+NEGOTIATION_STRATEGY = config('NEGOTIATION_STRATEGY', default='llm')
+NEGOTIATION_CONCESSION_BETA = 1.0
+NEGOTIATION_CONCESSION_INITIAL = 0.0
+NEGOTIATION_CONCESSION_HORIZON = 24 * 3600
+# Negotiation decision cache: offers are bucketed by NEGOTIATION_CACHE_BUCKET
+# steps of (offer / listed price, minimum / listed price)
+NEGOTIATION_CACHE_BUCKET = '0.01'
+NEGOTIATION_CACHE_TTL = 3600
+NEGOTIATION_CACHE_MAX_ENTRIES = 2048
+# Image sizing for visual search: uploads are decoded at most
+# VISION_UPLOAD_MAX_SIDE px; the vision model gets a JPEG of at most
+# VISION_IMAGE_MAX_SIDE px within VISION_IMAGE_MAX_BYTES
+VISION_UPLOAD_MAX_SIDE = 1024
+VISION_IMAGE_MAX_SIDE = 512
+VISION_IMAGE_MAX_BYTES = 100_000
+# Cache of vision-model descriptions keyed by perceptual image hash
+VISION_CACHE_TTL = 7 * 24 * 3600
+VISION_CACHE_MAX_ENTRIES = 5000
+VISION_CACHE_MAX_DISTANCE = 3  # Hamming bits; must stay below HASH_BANDS (4)
+
+# Listing pagination: 'cursor' (keyset, no COUNT query) or 'page' (page numbers)
+LISTING_PAGINATION = config('LISTING_PAGINATION', default='cursor')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+
+CURSOR_SALT = 'core.pagination.keyset'
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset.
+    Exposes the same has_next/has_previous/has_other_pages flags as a
+    Django Page, plus opaque cursors instead of page numbers.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, *, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Seek-method paginator: each page is fetched with
+    `WHERE (field, pk) > (last_field, last_pk) ORDER BY field, pk LIMIT n`
+    so deep pages cost the same as the first one and no COUNT(*) is needed.
+
+    `ordering` is a pair such as ('-created_at', '-id') or ('price', 'id');
+    the second entry must be the primary key so the sort is total.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+        field_name, pk_name = (name.lstrip('-') for name in self.ordering)
+        self.field_name = field_name
+        self.pk_name = pk_name
+        self.field = queryset.model._meta.get_field(field_name)
+        self.descending = self.ordering[0].startswith('-')
+
+    def _encode(self, obj, direction):
+        value = getattr(obj, self.field_name)
+        payload = {
+            'o': self.ordering[0],
+            'd': direction,
+            'v': self.field.value_to_string(obj) if value is not None else None,
+            'k': getattr(obj, self.pk_name),
+        }
+        return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, cursor):
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT)
+            if payload.get('o') != self.ordering[0] or payload.get('d') not in ('next', 'prev'):
+                return None
+            value = self.field.to_python(payload['v'])
+            return payload['d'], value, payload['k']
+        except (signing.BadSignature, ValidationError, KeyError, TypeError, ValueError):
+            return None
+
+    def _seek(self, value, pk, forward):
+        # Walking forward on a descending sort (or backward on an ascending
+        # one) means looking for smaller keys.
+        smaller = self.descending == forward
+        op = 'lt' if smaller else 'gt'
+        return (
+            Q(**{f'{self.field_name}__{op}': value}) |
+            Q(**{self.field_name: value, f'{self.pk_name}__{op}': pk})
+        )
+
+    def _reversed_ordering(self):
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        )
+
+    def get_page(self, cursor=None):
+        decoded = self._decode(cursor) if cursor else None
+
+        if decoded is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return KeysetPage(
+                rows,
+                next_cursor=self._encode(rows[-1], 'next') if has_more else None,
+            )
+
+        direction, value, pk = decoded
+        if direction == 'next':
+            rows = list(
+                self.queryset.filter(self._seek(value, pk, forward=True))
+                .order_by(*self.ordering)[:self.per_page + 1]
+            )
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return KeysetPage(
+                rows,
+                next_cursor=self._encode(rows[-1], 'next') if has_more else None,
+                previous_cursor=self._encode(rows[0], 'prev') if rows else None,
+            )
+
+        rows = list(
+            self.queryset.filter(self._seek(value, pk, forward=False))
+            .order_by(*self._reversed_ordering())[:self.per_page + 1]
+        )
+        has_more = len(rows) > self.per_page
+        rows = list(reversed(rows[:self.per_page]))
+        return KeysetPage(
+            rows,
+            next_cursor=self._encode(rows[-1], 'next') if rows else None,
+            previous_cursor=self._encode(rows[0], 'prev') if has_more else None,
+        )
+
+
+def paginate(request, queryset, *, per_page, ordering=None):
+    """
+    Paginate a listing queryset.
+
+    Uses keyset pagination (`?cursor=`) when an `ordering` pair is given and
+    settings.LISTING_PAGINATION is 'cursor'; otherwise, or when a legacy
+    `?page=` number is requested, falls back to Django's page-number Paginator.
+    """
+    if ordering:
+        queryset = queryset.order_by(*ordering)
+
+    mode = getattr(settings, 'LISTING_PAGINATION', 'cursor')
+    if ordering and mode == 'cursor' and not request.GET.get('page'):
+        paginator = KeysetPaginator(queryset, per_page, ordering)
+        return paginator.get_page(request.GET.get('cursor'))
+
+    paginator = Paginator(queryset, per_page)
+    return paginator.get_page(request.GET.get('page'))
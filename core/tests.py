@@ -1,3 +1,82 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from services import http_client
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Replies with the next queued (status, headers) and records each call."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status, headers = self.server.replies.pop(0) if self.server.replies else (200, {})
+        self.server.calls += 1
+
+        body = json.dumps({'status': status}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(LLM_HTTP_RETRIES=2, LLM_HTTP_BACKOFF=0.01)
+class PostJsonRetryTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.replies = []
+        self.server.calls = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+
+        session = requests.Session()
+        session.trust_env = False  # talk to the stub directly, not through a proxy
+        http_client.set_session(session)
+
+    def tearDown(self):
+        http_client.reset()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retries_transient_failure(self):
+        self.server.replies = [(503, {})]
+        self.assertEqual(http_client.post_json(self.url, {}), {'status': 200})
+        self.assertEqual(self.server.calls, 2)
+
+    def test_gives_up_after_configured_retries(self):
+        self.server.replies = [(503, {})] * 5
+        with self.assertRaises(requests.HTTPError):
+            http_client.post_json(self.url, {})
+        self.assertEqual(self.server.calls, 3)
+
+    def test_does_not_retry_client_errors(self):
+        self.server.replies = [(400, {})]
+        with self.assertRaises(requests.HTTPError):
+            http_client.post_json(self.url, {})
+        self.assertEqual(self.server.calls, 1)
+
+    @override_settings(LLM_HTTP_MAX_RETRY_DELAY=0.05)
+    def test_retry_after_is_capped(self):
+        self.server.replies = [(429, {'Retry-After': '3600'})]
+        started = time.monotonic()
+        self.assertEqual(http_client.post_json(self.url, {}), {'status': 200})
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(self.server.calls, 2)
+
+    def test_no_retry_past_the_deadline(self):
+        self.server.replies = [(503, {'Retry-After': '5'})]
+        started = time.monotonic()
+        with self.assertRaises(requests.HTTPError):
+            http_client.post_json(self.url, {}, deadline=started + 1)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.server.calls, 1)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import CustomerProfile, ShippingAddress, Cart, CartItem, Wishlist, Order, OrderItem
+from services import cart_service
 
 
 @admin.register(CustomerProfile)
@@ -27,22 +28,30 @@ class CartItemInline(admin.TabularInline):
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ['customer', 'get_total_items', 'get_total', 'created_at', 'updated_at']
+    list_select_related = ['customer']
     search_fields = ['customer__username', 'customer__email']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['total_items', 'subtotal', 'created_at', 'updated_at']
     inlines = [CartItemInline]
     
     def get_total_items(self, obj):
-        return obj.get_total_items()
+        return obj.total_items
     get_total_items.short_description = 'Total Items'
+    get_total_items.admin_order_field = 'total_items'
     
     def get_total(self, obj):
-        return f'Rs. {obj.get_total():.2f}'
+        return f'Rs. {obj.subtotal:.2f}'
     get_total.short_description = 'Total'
+    get_total.admin_order_field = 'subtotal'
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        cart_service.refresh_summary(form.instance)
 
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ['cart', 'product', 'quantity', 'get_total_price', 'added_at']
+    list_select_related = ['cart__customer', 'product']
     list_filter = ['added_at']
     search_fields = ['cart__customer__username', 'product__name']
     readonly_fields = ['added_at', 'updated_at']
@@ -50,6 +59,19 @@ class CartItemAdmin(admin.ModelAdmin):
     def get_total_price(self, obj):
         return f'Rs. {obj.get_total_price():.2f}'
     get_total_price.short_description = 'Total Price'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        cart_service.refresh_summary(obj.cart)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        cart_service.refresh_summary(obj.cart)
+    
+    def delete_queryset(self, request, queryset):
+        cart_ids = list(queryset.values_list('cart_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        cart_service.refresh_summaries(cart_ids)
 
 
 @admin.register(Wishlist)
@@ -0,0 +1,34 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from services.recommendation_service import refresh_user_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored per-user product recommendations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only refresh this user id (may be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if not user_ids:
+            user_ids = User.objects.filter(is_active=True).values_list('id', flat=True).iterator()
+
+        started = time.monotonic()
+        count = 0
+        for user_id in user_ids:
+            refresh_user_recommendations(user_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed recommendations for {count} users in {time.monotonic() - started:.2f}s.'
+        ))
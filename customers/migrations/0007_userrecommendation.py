@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_negotiation_attempt_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('customers', '0006_negotiatedorder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_recommendations', to='products.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'rank'],
+                'unique_together': {('user', 'rank')},
+            },
+        ),
+    ]
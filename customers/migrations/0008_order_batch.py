@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('customers', '0007_userrecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='customers.orderbatch'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderbatch',
+            constraint=models.UniqueConstraint(fields=('customer', 'idempotency_key'), name='unique_order_batch_key'),
+        ),
+    ]
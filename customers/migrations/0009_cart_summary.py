@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:34
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_cart_summary(apps, schema_editor):
+    Cart = apps.get_model('customers', 'Cart')
+    CartItem = apps.get_model('customers', 'CartItem')
+
+    money = DecimalField(max_digits=12, decimal_places=2)
+    line_total = ExpressionWrapper(
+        F('product__price')
+        * (100 - F('product__discount_percentage'))
+        * F('quantity')
+        * Value(Decimal('0.01')),
+        output_field=money,
+    )
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    Cart.objects.update(
+        total_items=Coalesce(Subquery(items.annotate(total=Sum('quantity')).values('total')[:1]), 0),
+        subtotal=Coalesce(
+            Subquery(items.annotate(total=Sum(line_total)).values('total')[:1]),
+            Value(Decimal('0.00')),
+            output_field=money,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0008_order_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_cart_summary, migrations.RunPython.noop),
+    ]
@@ -71,6 +71,11 @@ class Cart(models.Model):
     Shopping cart for customers
     """
     customer = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    
+    # Cached summary, kept current by services.cart_service when items or prices change
+    total_items = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -82,12 +87,12 @@ class Cart(models.Model):
         return f'{self.customer.username}\'s Cart'
     
     def get_total_items(self):
-        """Get total number of items in cart"""
-        return sum(item.quantity for item in self.items.all())
+        """Get total number of items in cart (cached summary)"""
+        return self.total_items
     
     def get_subtotal(self):
-        """Calculate cart subtotal"""
-        return sum(item.get_total_price() for item in self.items.all())
+        """Calculate cart subtotal (cached summary)"""
+        return self.subtotal
     
     def get_total(self):
         """Calculate cart total (can add tax, shipping later)"""
@@ -142,6 +147,24 @@ class Wishlist(models.Model):
         return f'{self.customer.username} - {self.product.name}'
 
 
+class OrderBatch(models.Model):
+    """
+    One checkout submission. The idempotency key is issued with the checkout
+    form, so a repeated POST finds its batch and creates nothing new
+    """
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='order_batches')
+    idempotency_key = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'idempotency_key'], name='unique_order_batch_key'),
+        ]
+
+    def __str__(self):
+        return f'Checkout {self.idempotency_key} - {self.customer_id}'
+
+
 class Order(models.Model):
     """
     Customer orders
@@ -177,6 +200,9 @@ class Order(models.Model):
     # ADDED: Link to Seller (Crucial for Multi-Vendor)
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seller_orders', null=True, blank=True)
     
+    # Checkout submission that created this order (one per seller share a batch)
+    batch = models.ForeignKey(OrderBatch, on_delete=models.SET_NULL, related_name='orders', null=True, blank=True)
+    
     # Order status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
@@ -219,14 +245,15 @@ class Order(models.Model):
             models.Index(fields=['status']),
         ]
     
+    @staticmethod
+    def generate_order_number():
+        from services import order_number_service
+        return order_number_service.generate()[0]
+    
     def save(self, *args, **kwargs):
+        # bulk_create skips save(); services.checkout_service assigns numbers itself
         if not self.order_number:
-            import random
-            import string
-            from django.utils import timezone
-            timestamp = timezone.now().strftime('%Y%m%d')
-            random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            self.order_number = f'ORD-{timestamp}-{random_str}'
+            self.order_number = self.generate_order_number()
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -277,6 +304,24 @@ class OrderItem(models.Model):
         return f'{self.quantity}x {self.product_name}'
 
 
+class UserRecommendation(models.Model):
+    """
+    Precomputed product recommendations per user, best first
+    (maintained by services.recommendation_service)
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='user_recommendations')
+    rank = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['user', 'rank']
+        unique_together = ('user', 'rank')
+
+    def __str__(self):
+        return f'{self.user_id} #{self.rank}: {self.product_id}'
+
+
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='notifications')
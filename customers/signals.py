@@ -1,8 +1,10 @@
 from django.db import transaction
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
-from .models import Notification, Order
+from services import recommendation_service
+
+from .models import Notification, Order, OrderItem, Wishlist
 
 
 @receiver(pre_save, sender=Order)
@@ -49,3 +51,23 @@ def _order_status_notification(sender, instance, created, **kwargs):
             )
 
     transaction.on_commit(_create_notifications)
+
+
+def _schedule_recommendation_refresh(user_id):
+    transaction.on_commit(lambda: recommendation_service.schedule_refresh(user_id))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def _order_item_refresh_recommendations(sender, instance, **kwargs):
+    try:
+        customer_id = instance.order.customer_id
+    except Order.DoesNotExist:
+        return
+    _schedule_recommendation_refresh(customer_id)
+
+
+@receiver(post_save, sender=Wishlist)
+@receiver(post_delete, sender=Wishlist)
+def _wishlist_refresh_recommendations(sender, instance, **kwargs):
+    _schedule_recommendation_refresh(instance.customer_id)
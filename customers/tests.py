@@ -1,3 +1,197 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from products.models import Category, Product
+from services import autocomplete_service, recommendation_service
+from services.checkout_service import OutOfStock, issue_checkout_key, place_orders
+
+from .models import Cart, CartItem, Order, OrderBatch, OrderItem, ShippingAddress, UserRecommendation
+
+
+class PlaceOrdersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('buyer')
+        cls.sellers = [User.objects.create_user('seller1'), User.objects.create_user('seller2')]
+        category = Category.objects.create(name='General')
+        Product.objects.bulk_create([
+            Product(
+                name=f'Product {i}', slug=f'product-{i}', description='Test product',
+                category=category, price=100 + i, stock=5,
+                seller=cls.sellers[i % 2], sku=f'SKU-{i}',
+            )
+            for i in range(12)
+        ])
+        cls.products = list(Product.objects.order_by('id'))
+        cls.address = ShippingAddress.objects.create(
+            customer=cls.customer, full_name='Test Buyer', phone='0700000000',
+            address_line_1='1 Main Street', city='Kampala', state='Central', postal_code='00000',
+        )
+
+    def _place(self, lines):
+        return place_orders(self.customer, lines, shipping_address=self.address)
+
+    def test_reserves_stock_and_splits_by_seller(self):
+        first, second = self.products[:2]
+        orders = self._place([(first.id, 2, None), (second.id, 3, None)])
+
+        self.assertEqual(len(orders), 2)
+        self.assertEqual({o.seller_id for o in orders}, {first.seller_id, second.seller_id})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.stock, second.stock), (3, 2))
+        self.assertEqual(OrderItem.objects.filter(order__in=orders).count(), 2)
+
+    def test_out_of_stock_rolls_back_whole_batch(self):
+        first, second = self.products[:2]
+        with self.assertRaises(OutOfStock) as raised:
+            self._place([(first.id, 2, None), (second.id, 6, None)])
+
+        self.assertEqual([p.id for p in raised.exception.products], [second.id])
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(OrderItem.objects.count(), 0)
+        self.assertEqual(Product.objects.get(id=first.id).stock, 5)
+
+    def test_query_count_does_not_grow_with_lines(self):
+        def count_queries(products):
+            with CaptureQueriesContext(connection) as queries:
+                self._place([(p.id, 1, None) for p in products])
+            return len(queries)
+
+        self.assertEqual(count_queries(self.products[:2]), count_queries(self.products[2:12]))
+
+
+class CheckoutIdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('buyer', password='secret')
+        seller = User.objects.create_user('seller')
+        category = Category.objects.create(name='General')
+        cls.product = Product.objects.create(
+            name='Desk Lamp', description='Test product', category=category,
+            price=100, stock=5, seller=seller, sku='LAMP-1',
+        )
+        cls.address = ShippingAddress.objects.create(
+            customer=cls.customer, full_name='Test Buyer', phone='0700000000',
+            address_line_1='1 Main Street', city='Kampala', state='Central', postal_code='00000',
+        )
+
+    def setUp(self):
+        self.client.login(username='buyer', password='secret')
+        cart, _ = Cart.objects.get_or_create(customer=self.customer)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+
+    def _checkout(self, key):
+        return self.client.post(reverse('customers:checkout'), {
+            'saved_address': self.address.id,
+            'payment_method': 'cod',
+            'checkout_key': key,
+        })
+
+    def test_resubmitted_form_places_one_batch(self):
+        key = issue_checkout_key()
+        first = self._checkout(key)
+        second = self._checkout(key)
+
+        self.assertRedirects(first, reverse('customers:orders'), fetch_redirect_response=False)
+        self.assertRedirects(second, reverse('customers:orders'), fetch_redirect_response=False)
+        self.assertEqual(OrderBatch.objects.filter(customer=self.customer).count(), 1)
+        self.assertEqual(Order.objects.filter(customer=self.customer).count(), 1)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock, 4)
+
+    def test_malformed_key_is_replaced(self):
+        self._checkout('x' * 200)
+
+        batch = OrderBatch.objects.get(customer=self.customer)
+        self.assertNotEqual(batch.idempotency_key, 'x' * 200)
+        self.assertEqual(len(batch.idempotency_key), 32)
+
+
+class CartSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('buyer', password='secret')
+        seller = User.objects.create_user('seller')
+        category = Category.objects.create(name='General')
+        cls.product = Product.objects.create(
+            name='Desk Lamp', description='Test product', category=category,
+            price=100, stock=5, seller=seller, sku='LAMP-1',
+        )
+
+    def setUp(self):
+        self.client.login(username='buyer', password='secret')
+
+    def _cart(self):
+        return Cart.objects.get(customer=self.customer)
+
+    def test_views_keep_cached_summary_current(self):
+        url = reverse('customers:cart_add', args=[self.product.id])
+        self.client.get(url)
+        self.client.get(url)
+        cart = self._cart()
+        self.assertEqual((cart.get_total_items(), cart.get_total()), (2, 200))
+
+        item = cart.items.get()
+        response = self.client.post(
+            reverse('customers:cart_update', args=[item.id]),
+            '{"change": 1}', content_type='application/json',
+        )
+        self.assertEqual(response.json()['cart_count'], 3)
+        self.assertEqual(self._cart().total_items, 3)
+
+        response = self.client.post(reverse('customers:cart_remove', args=[item.id]))
+        self.assertEqual(response.json()['cart_count'], 0)
+        self.assertEqual((self._cart().total_items, self._cart().subtotal), (0, 0))
+
+    def test_summary_methods_do_not_query(self):
+        cart = Cart.objects.create(customer=self.customer, total_items=4, subtotal=250)
+        with self.assertNumQueries(0):
+            self.assertEqual(cart.get_total_items(), 4)
+            self.assertEqual(cart.get_total(), 250)
+
+
+class UserRecommendationReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('buyer')
+        seller = User.objects.create_user('seller')
+        category = Category.objects.create(name='General')
+        cls.product = Product.objects.create(
+            name='Desk Lamp', description='Test product', category=category,
+            price=100, stock=5, seller=seller, sku='LAMP-1',
+        )
+
+    def test_missing_recommendations_are_queued_not_computed(self):
+        with mock.patch.object(recommendation_service, 'schedule_refresh') as schedule:
+            products = recommendation_service.get_recommendations_for_user(self.customer)
+
+        schedule.assert_called_once_with(self.customer.pk)
+        self.assertEqual(products, [self.product])
+        self.assertFalse(UserRecommendation.objects.exists())
+
+
+class AiSearchSuggestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user('seller')
+        category = Category.objects.create(name='Lighting')
+        Product.objects.create(
+            name='Desk Lamp', description='Test product', category=category,
+            price=100, stock=5, seller=seller, sku='LAMP-1',
+        )
+
+    def setUp(self):
+        autocomplete_service.invalidate()
+
+    def test_suggests_by_prefix(self):
+        response = self.client.get(reverse('customers:ai_search_suggest'), {'q': 'lam'})
+        self.assertEqual(response.json()['suggestions'], [{'text': 'Desk Lamp', 'kind': 'product'}])
 
-# Create your tests here.
+    def test_rejects_post(self):
+        response = self.client.post(reverse('customers:ai_search_suggest'), {'q': 'lam'})
+        self.assertEqual(response.status_code, 405)
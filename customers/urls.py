@@ -37,6 +37,7 @@ urlpatterns = [
     path('cart/', views.cart_view, name='cart'),
     path('cart/add/<int:product_id>/', views.cart_add, name='cart_add'),
     path('cart/update/<int:item_id>/', views.cart_update, name='cart_update'),
+    path('cart/batch/', views.cart_batch_update, name='cart_batch'),
     path('cart/remove/<int:item_id>/', views.cart_remove, name='cart_remove'),
     path('cart/clear/', views.cart_clear, name='cart_clear'),
     
@@ -46,6 +47,7 @@ urlpatterns = [
     
     # AI Features
     path('ai-search/', views.ai_search_view, name='ai_search'),
+    path('ai-search/suggest/', views.ai_search_suggest, name='ai_search_suggest'),
     path('ai-search/image/', views.ai_image_search, name='ai_image_search'),
     path('ai-chatbot/', views.ai_chatbot_view, name='ai_chatbot'),
 ]
\ No newline at end of file
@@ -4,25 +4,33 @@ from django.contrib import messages
 from django.db.models import Sum, Count, Q  
 from django.utils import timezone
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 from django.urls import reverse
 from urllib.parse import urlencode
 import logging
 import json
-from .models import CustomerProfile, ShippingAddress, Cart, CartItem, Wishlist, Order, OrderItem, NegotiatedOrder
-from products.models import ProductNegotiation, ProductNegotiationOffer
+from .models import CustomerProfile, ShippingAddress, Cart, CartItem, Wishlist, Order, NegotiatedOrder
+from products.models import ProductEvent, ProductNegotiation, ProductNegotiationOffer
 from products.models import Product, Category
+from services import cart_service
 from django.contrib.auth.models import User
 from django.db import transaction
 from sellers.models import Message
 
 logger = logging.getLogger(__name__)
 
+CART_BATCH_MAX_OPERATIONS = 100
+
 def home(request):
     """
     Customer homepage with all products and personalized recommendations
     """
-    from services.recommendation_service import get_recommendations_for_user, get_recommendations_for_guest
+    from services.recommendation_service import (
+        get_ai_recommended_products,
+        get_recommendations_for_guest,
+        get_recommendations_for_user,
+    )
+    from services.trending_service import get_trending_products
 
     # Main product list
     products = Product.objects.filter(is_available=True).order_by('-created_at')
@@ -36,7 +44,10 @@ def home(request):
         recommendation_label = 'Trending Products'
 
     # Keep existing ai_products for backward compatibility (used by carousel)
-    ai_products = Product.objects.filter(is_available=True, ai_recommended=True).order_by('-created_at')[:6]
+    ai_products = get_ai_recommended_products(limit=6)
+
+    # Time-decayed popularity (compact_product_events)
+    trending_products = get_trending_products(limit=6)
     
     # Categories for sidebar with product count (Using Q object)
     categories = Category.objects.filter(is_active=True).annotate(
@@ -53,6 +64,7 @@ def home(request):
     context = {
         'products': products,
         'ai_products': ai_products,
+        'trending_products': trending_products,
         'recommended_products': recommended_products,
         'recommendation_label': recommendation_label,
         'categories': categories,
@@ -231,8 +243,12 @@ def wishlist_add(request, product_id):
     """
     Add product to wishlist
     """
+    from services.trending_service import record_event
+
     product = get_object_or_404(Product, pk=product_id)
-    Wishlist.objects.get_or_create(customer=request.user, product=product)
+    _, created = Wishlist.objects.get_or_create(customer=request.user, product=product)
+    if created:
+        record_event(product.id, ProductEvent.KIND_WISHLIST)
     messages.success(request, f'{product.name} added to wishlist!')
     return redirect(request.META.get('HTTP_REFERER') or 'customers:wishlist')
 
@@ -252,21 +268,29 @@ def cart_view(request):
     View shopping cart
     """
     cart, created = Cart.objects.get_or_create(customer=request.user)
-    return render(request, 'customers/cart.html', {'cart': cart})
+    items = cart.items.select_related('product', 'product__category')
+    return render(request, 'customers/cart.html', {'cart': cart, 'items': items})
 
 @login_required
 def cart_add(request, product_id):
     """
     Add product to cart
     """
+    from services.trending_service import record_event
+
     product = get_object_or_404(Product, pk=product_id)
-    cart, created = Cart.objects.get_or_create(customer=request.user)
-    
-    cart_item, item_created = CartItem.objects.get_or_create(cart=cart, product=product)
+    Cart.objects.get_or_create(customer=request.user)
     
-    if not item_created:
-        cart_item.quantity += 1
-        cart_item.save()
+    with transaction.atomic():
+        cart = cart_service.lock_cart(request.user)
+        cart_item, item_created = CartItem.objects.get_or_create(cart=cart, product=product)
+        
+        if not item_created:
+            cart_item.quantity += 1
+            cart_item.save()
+        cart_service.refresh_summary(cart)
+
+    record_event(product.id, ProductEvent.KIND_CART_ADD)
     
     messages.success(request, f'{product.name} added to cart!')
     return redirect(request.META.get('HTTP_REFERER', 'customers:cart'))
@@ -278,50 +302,75 @@ def cart_update(request, item_id):
     Update cart item quantity via AJAX
     """
     try:
-        try:
-            cart_item = CartItem.objects.get(id=item_id, cart__customer=request.user)
-        except CartItem.DoesNotExist:
-            return JsonResponse({'success': False, 'message': 'Item not found in cart'})
-
         data = json.loads(request.body)
         change = int(data.get('change', 0))
-        
-        new_quantity = cart_item.quantity + change
-        
-        if new_quantity <= 0:
-            # Remove item if quantity reaches 0
-            cart_item.delete()
-            cart = Cart.objects.get(customer=request.user)
-            return JsonResponse({
-                'success': True,
-                'removed': True,
-                'cart_total': float(cart.get_total()),
-                'cart_count': cart.get_total_items()
-            })
-        
-        # Validate against stock
-        if new_quantity > cart_item.product.stock:
-            return JsonResponse({
-                'success': False,
-                'message': f'Only {cart_item.product.stock} items available in stock'
-            })
-        
-        cart_item.quantity = new_quantity
-        cart_item.save()
-        
-        cart = cart_item.cart
+
+        with transaction.atomic():
+            try:
+                cart = cart_service.lock_cart(request.user)
+                cart_item = CartItem.objects.select_related('product').get(id=item_id, cart=cart)
+            except (Cart.DoesNotExist, CartItem.DoesNotExist):
+                return JsonResponse({'success': False, 'message': 'Item not found in cart'})
+
+            new_quantity = cart_item.quantity + change
+            
+            if new_quantity <= 0:
+                # Remove item if quantity reaches 0
+                cart_item.delete()
+                summary = cart_service.refresh_summary(cart)
+                return JsonResponse({
+                    'success': True,
+                    'removed': True,
+                    'cart_total': float(summary['subtotal']),
+                    'cart_count': summary['total_items']
+                })
+            
+            # Validate against stock
+            if new_quantity > cart_item.product.stock:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Only {cart_item.product.stock} items available in stock'
+                })
+            
+            cart_item.quantity = new_quantity
+            cart_item.save()
+            
+            summary = cart_service.refresh_summary(cart)
         return JsonResponse({
             'success': True,
             'removed': False,
             'quantity': cart_item.quantity,
             'item_total': float(cart_item.get_total_price()),
-            'cart_total': float(cart.get_total()),
-            'cart_count': cart.get_total_items(),
+            'cart_total': float(summary['subtotal']),
+            'cart_count': summary['total_items'],
             'max_stock': cart_item.product.stock
         })
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)})
 
+@login_required
+@require_POST
+def cart_batch_update(request):
+    """
+    Apply several quantity changes at once via AJAX.
+    Body: {"operations": [{"item_id": 1, "delta": 2}, ...]}
+    """
+    try:
+        data = json.loads(request.body)
+        operations = [(int(op['item_id']), int(op['delta'])) for op in data.get('operations', [])]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({'success': False, 'message': 'Invalid cart operations'}, status=400)
+
+    if len(operations) > CART_BATCH_MAX_OPERATIONS:
+        return JsonResponse({'success': False, 'message': 'Too many cart operations'}, status=400)
+
+    try:
+        cart, created = Cart.objects.get_or_create(customer=request.user)
+        state = cart_service.apply_operations(cart, operations)
+        return JsonResponse({'success': True, **state})
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': str(e)})
+
 @login_required
 @require_POST
 def cart_remove(request, item_id):
@@ -329,18 +378,20 @@ def cart_remove(request, item_id):
     Remove item from cart via AJAX
     """
     try:
-        try:
-            cart_item = CartItem.objects.get(id=item_id, cart__customer=request.user)
-        except CartItem.DoesNotExist:
-            return JsonResponse({'success': False, 'message': 'Item not found in cart'})
+        with transaction.atomic():
+            try:
+                cart = cart_service.lock_cart(request.user)
+                cart_item = CartItem.objects.get(id=item_id, cart=cart)
+            except (Cart.DoesNotExist, CartItem.DoesNotExist):
+                return JsonResponse({'success': False, 'message': 'Item not found in cart'})
 
-        cart_item.delete()
-        
-        cart = Cart.objects.get(customer=request.user)
+            cart_item.delete()
+            
+            summary = cart_service.refresh_summary(cart)
         return JsonResponse({
             'success': True,
-            'cart_total': float(cart.get_total()),
-            'cart_count': cart.get_total_items()
+            'cart_total': float(summary['subtotal']),
+            'cart_count': summary['total_items']
         })
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)})
@@ -352,8 +403,10 @@ def cart_clear(request):
     Clear all items from cart via AJAX
     """
     try:
-        cart = Cart.objects.get(customer=request.user)
-        cart.items.all().delete()
+        with transaction.atomic():
+            cart = cart_service.lock_cart(request.user)
+            cart.items.all().delete()
+            cart_service.refresh_summary(cart)
         
         return JsonResponse({
             'success': True,
@@ -369,13 +422,29 @@ def checkout_view(request):
     cart_items = cart.items.select_related('product', 'product__seller').all()
     addresses = ShippingAddress.objects.filter(customer=request.user)
     
+    from services.checkout_service import (
+        OutOfStock,
+        claim_batch,
+        clean_checkout_key,
+        find_batch,
+        issue_checkout_key,
+        place_orders,
+    )
+
     if request.method == 'POST':
+        # 0. A resubmitted form (double click, retry) replays the original result
+        checkout_key = clean_checkout_key(request.POST.get('checkout_key'))
+        if find_batch(request.user, checkout_key):
+            messages.success(request, 'Order placed successfully!')
+            return redirect('customers:orders')
+
         # 1. Get Payment Method
         payment_method = request.POST.get('payment_method', 'cod')
         
         # 2. Determine Shipping Address
         saved_address_id = request.POST.get('saved_address') # Changed from 'address_id' to match template
         shipping_address = None
+        save_info = False
 
         # Case A: User selected an existing address
         if saved_address_id:
@@ -399,8 +468,7 @@ def checkout_view(request):
                 return redirect('customers:checkout')
 
             # Create the address object (we don't save it to DB yet unless requested)
-            # However, for the Order foreign key, we usually need a saved object.
-            # Strategy: Create a ShippingAddress record.
+            # The orders keep a snapshot of it either way.
             
             shipping_address = ShippingAddress(
                 customer=request.user,
@@ -414,17 +482,7 @@ def checkout_view(request):
                 country=country,
                 is_default=False
             )
-            
-            # If user checked "Save this address", save it permanently.
-            # Otherwise, we still save it to link to the Order, but you might want to mark it hidden or 
-            # just use it as a one-time record. For simplicity here, we save it.
-            if save_info:
-                shipping_address.save()
-            else:
-                # If we don't want to save it to the user's profile, we can still save it 
-                # but maybe we need logic to hide it from their list? 
-                # For now, let's save it so the ForeignKey works.
-                shipping_address.save()
+
 
         if not cart_items.exists():
             messages.error(request, 'Your cart is empty.')
@@ -432,66 +490,46 @@ def checkout_view(request):
 
         try:
             with transaction.atomic():
-                # Group items by seller
-                items_by_seller = {}
-                for item in cart_items:
-                    seller = item.product.seller
-                    if seller not in items_by_seller:
-                        items_by_seller[seller] = []
-                    items_by_seller[seller].append(item)
-                
-                # Create one order per seller
-                for seller, items in items_by_seller.items():
-                    # Calculate totals
-                    order_subtotal = sum(item.get_total_price() for item in items)
-                    order_tax = 0 
-                    order_total = order_subtotal + order_tax
-                    
-                    order = Order.objects.create(
-                        customer=request.user,
-                        seller=seller,
-                        status='pending',
-                        payment_method=payment_method,
-                        shipping_address=shipping_address, # Links to the address object
-                        # Snapshot the address details in case the address object changes/deletes later
-                        shipping_full_name=shipping_address.full_name,
-                        shipping_phone=shipping_address.phone,
-                        shipping_address_line_1=shipping_address.address_line_1,
-                        shipping_city=shipping_address.city,
-                        shipping_state=shipping_address.state,
-                        shipping_postal_code=shipping_address.postal_code,
-                        shipping_country=shipping_address.country,
-                        subtotal=order_subtotal,
-                        total=order_total
-                    )
-                    
-                    # Create Order Items
-                    # Create Order Items and reduce stock
-                    for item in items:
-                        OrderItem.objects.create(
-                        order=order,
-                        product=item.product,
-                        product_name=item.product.name,
-                        product_sku=item.product.sku,
-                        product_image=item.product.main_image,
-                        price=item.product.get_discount_price(),
-                        quantity=item.quantity
-                        )
-                    # Reduce stock
-                    item.product.stock = max(0, item.product.stock - item.quantity)
-                    item.product.save(update_fields=['stock'])
-                
+                batch = claim_batch(request.user, checkout_key)
+                if batch is None:
+                    # The same form was submitted concurrently and has gone through
+                    messages.success(request, 'Order placed successfully!')
+                    return redirect('customers:orders')
+
+                # If user checked "Save this address", save it permanently.
+                if save_info:
+                    shipping_address.save()
+
+                # One order per seller; stock is reserved for all items at once
+                place_orders(
+                    request.user,
+                    [(item.product_id, item.quantity, None) for item in cart_items],
+                    shipping_address=shipping_address,
+                    payment_method=payment_method,
+                    batch=batch,
+                )
+
                 # Clear Cart
                 cart.items.all().delete()
+                cart_service.refresh_summary(cart)
                 
                 messages.success(request, 'Order placed successfully!')
                 return redirect('customers:orders')
                 
+        except OutOfStock as e:
+            messages.error(request, f'{e}. Please update your cart.')
+            return redirect('customers:cart')
         except Exception as e:
             messages.error(request, f'Error processing order: {str(e)}')
             return redirect('customers:checkout')
         
-    return render(request, 'customers/checkout.html', {'cart': cart, 'addresses': addresses})
+    context = {
+        'cart': cart,
+        'cart_items': cart_items,
+        'addresses': addresses,
+        'checkout_key': issue_checkout_key(),
+    }
+    return render(request, 'customers/checkout.html', context)
 
 @login_required
 def checkout_with_negotiation(request, order_id):
@@ -501,6 +539,21 @@ def checkout_with_negotiation(request, order_id):
         messages.error(request, 'You do not have access to this negotiated checkout.')
         return redirect('customers:home')
 
+    from services.checkout_service import (
+        OutOfStock,
+        claim_batch,
+        clean_checkout_key,
+        find_batch,
+        issue_checkout_key,
+        place_orders,
+    )
+
+    # A resubmitted form (double click, retry) replays the original result
+    checkout_key = clean_checkout_key(request.POST.get('checkout_key'))
+    if request.method == 'POST' and find_batch(request.user, checkout_key):
+        messages.success(request, 'Order placed successfully!')
+        return redirect('customers:orders')
+
     if negotiated_order.status != NegotiatedOrder.STATUS_PENDING:
         messages.error(request, 'This negotiated order is no longer available.')
         return redirect('products:negotiate', slug=negotiated_order.product.slug)
@@ -519,6 +572,7 @@ def checkout_with_negotiation(request, order_id):
 
         saved_address_id = request.POST.get('saved_address')
         shipping_address = None
+        save_info = False
 
         if saved_address_id:
             shipping_address = get_object_or_404(ShippingAddress, id=saved_address_id, customer=request.user)
@@ -549,14 +603,14 @@ def checkout_with_negotiation(request, order_id):
                 is_default=False,
             )
 
-            if save_info:
-                shipping_address.save()
-            else:
-                shipping_address.save()
-
         try:
             with transaction.atomic():
                 refreshed = NegotiatedOrder.objects.select_for_update().get(pk=negotiated_order.pk)
+                # A duplicate submit waits on the lock above, then finds the first one's batch
+                if find_batch(request.user, checkout_key):
+                    messages.success(request, 'Order placed successfully!')
+                    return redirect('customers:orders')
+
                 if refreshed.status != NegotiatedOrder.STATUS_PENDING:
                     messages.error(request, 'This negotiated order is no longer available.')
                     return redirect('products:negotiate', slug=product.slug)
@@ -567,44 +621,30 @@ def checkout_with_negotiation(request, order_id):
                     messages.error(request, 'This negotiated price has expired. Please negotiate again.')
                     return redirect('products:negotiate', slug=product.slug)
 
-                order_subtotal = refreshed.negotiated_price
-                order_tax = 0
-                order_total = order_subtotal + order_tax
+                batch = claim_batch(request.user, checkout_key)
+                if batch is None:
+                    messages.success(request, 'Order placed successfully!')
+                    return redirect('customers:orders')
 
-                order = Order.objects.create(
-                    customer=request.user,
-                    seller=product.seller,
-                    status='pending',
-                    payment_method=payment_method,
-                    shipping_address=shipping_address,
-                    shipping_full_name=shipping_address.full_name,
-                    shipping_phone=shipping_address.phone,
-                    shipping_address_line_1=shipping_address.address_line_1,
-                    shipping_city=shipping_address.city,
-                    shipping_state=shipping_address.state,
-                    shipping_postal_code=shipping_address.postal_code,
-                    shipping_country=shipping_address.country,
-                    subtotal=order_subtotal,
-                    total=order_total,
-                )
+                if save_info:
+                    shipping_address.save()
 
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    product_name=product.name,
-                    product_sku=product.sku,
-                    product_image=product.main_image,
-                    price=refreshed.negotiated_price,
-                    quantity=1,
+                place_orders(
+                    request.user,
+                    [(product.id, 1, refreshed.negotiated_price)],
+                    shipping_address=shipping_address,
+                    payment_method=payment_method,
+                    batch=batch,
                 )
-                product.stock = max(0, product.stock - 1)
-                product.save(update_fields=['stock'])
                 refreshed.status = NegotiatedOrder.STATUS_COMPLETED
                 refreshed.save(update_fields=['status'])
 
                 messages.success(request, 'Order placed successfully!')
                 return redirect('customers:orders')
 
+        except OutOfStock:
+            messages.error(request, f'{product.name} is out of stock.')
+            return redirect('products:detail', slug=product.slug)
         except Exception as e:
             messages.error(request, f'Error processing negotiated order: {str(e)}')
             return redirect('checkout_with_negotiation', order_id=negotiated_order.id)
@@ -613,6 +653,7 @@ def checkout_with_negotiation(request, order_id):
         'negotiated_order': negotiated_order,
         'product': product,
         'addresses': addresses,
+        'checkout_key': issue_checkout_key(),
     }
     return render(request, 'customers/checkout_negotiated.html', context)
 
@@ -789,20 +830,22 @@ def ai_search_view(request):
     """
     AI Search page
     """
-    suggestions = list(
-        Product.objects.filter(is_available=True)
-        .order_by('-created_at')
-        .values_list('name', flat=True)[:50]
-    )
-    visual_result_count = Product.objects.filter(is_available=True).count()
-    return render(
-        request,
-        'customers/ai_search.html',
-        {
-            'suggestions': suggestions,
-            'visual_result_count': visual_result_count,
-        },
-    )
+    return render(request, 'customers/ai_search.html')
+
+@require_GET
+def ai_search_suggest(request):
+    """
+    Typeahead suggestions (JSON) for the AI search box
+    """
+    from services.autocomplete_service import suggest
+
+    query = request.GET.get('q', '')
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except (TypeError, ValueError):
+        limit = 8
+
+    return JsonResponse({'query': query, 'suggestions': suggest(query, limit=limit)})
 
 def ai_image_search(request):
     if request.method != 'POST':
@@ -814,26 +857,18 @@ def ai_image_search(request):
         return redirect('customers:ai_search')
 
     try:
-        from PIL import Image as PILImage
-        from services.visual_search_service import find_similar_products
+        from services.visual_search_service import find_similar_products, load_upload_image
 
-        image = PILImage.open(uploaded_file).convert('RGB')
+        image = load_upload_image(uploaded_file)
         matched_products, search_description = find_similar_products(image, top_k=6)
 
         show_google_fallback = len(matched_products) < 3
 
-        suggestions = list(
-            Product.objects.filter(is_available=True)
-            .order_by('-created_at')
-            .values_list('name', flat=True)[:50]
-        )
-
         context = {
             'search_results': matched_products,
             'show_google_fallback': show_google_fallback,
             'is_visual_search': True,
             'visual_description': search_description,
-            'suggestions': suggestions,
             'visual_result_count': len(matched_products),
         }
         return render(request, 'customers/ai_search.html', context)
@@ -0,0 +1,83 @@
+import random
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from services import llama_service
+from services.negotiation_strategies import get_strategy
+
+
+class Command(BaseCommand):
+    help = 'Compare the throughput of negotiation strategies on synthetic middle-band offers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strategies',
+            default='concession,time_decay,llm',
+            help='Comma-separated strategy names to benchmark.',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=10000,
+            help='Offers per local strategy.',
+        )
+        parser.add_argument(
+            '--llm-iterations',
+            type=int,
+            default=20,
+            help='Offers for the LLM strategy (each may be a network call).',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _offers(self, count, seed):
+        rng = random.Random(seed)
+        discount = Decimal(str(settings.MAX_NEGOTIATION_DISCOUNT))
+        max_attempts = int(getattr(settings, 'MAX_NEGOTIATION_ATTEMPTS', 3))
+        started_at = timezone.now()
+
+        offers = []
+        for _ in range(count):
+            listed = Decimal(rng.randrange(1000, 500000)).quantize(Decimal('0.01'))
+            minimum = (listed * (1 - discount)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            offer = (minimum + (listed - minimum) * Decimal(str(rng.random()))).quantize(
+                Decimal('0.01'), rounding=ROUND_HALF_UP,
+            )
+            offers.append({
+                'listed_price': listed,
+                'min_price': minimum,
+                'offer': offer,
+                'attempt': rng.randint(1, max_attempts),
+                'max_attempts': max_attempts,
+                'started_at': started_at,
+            })
+        return offers
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['strategies'].split(',') if name.strip()]
+
+        for name in names:
+            strategy = get_strategy(name)
+            count = options['llm_iterations'] if name == 'llm' else options['iterations']
+            offers = self._offers(count, options['seed'])
+            if name == 'llm':
+                # Measure real calls, not decision-cache hits
+                llama_service.get_decision_cache().clear()
+
+            decisions = {}
+            started = time.perf_counter()
+            for offer in offers:
+                result = strategy.decide(**offer)
+                decisions[result['decision']] = decisions.get(result['decision'], 0) + 1
+            elapsed = time.perf_counter() - started
+
+            per_call = elapsed / count * 1e6 if count else 0.0
+            rate = count / elapsed if elapsed else float('inf')
+            summary = ', '.join(f'{key}={value}' for key, value in sorted(decisions.items()))
+            self.stdout.write(
+                f'{strategy.name:<12} {count:>7} offers  {rate:>12,.0f} offers/s  '
+                f'{per_call:>10.1f} us/offer  ({summary})'
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from services import image_index_service
+
+
+class Command(BaseCommand):
+    help = 'Compute missing image embeddings and rebuild the visual search matrix.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recompute every embedding, even when the stored one is current.',
+        )
+
+    def handle(self, *args, **options):
+        computed = 0
+        for product in Product.objects.exclude(main_image='').iterator():
+            if image_index_service.index_product_image(product, force=options['force']):
+                computed += 1
+
+        rows = image_index_service.rebuild_matrix()
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed {computed} embeddings; visual index holds {rows} vectors.'
+        ))
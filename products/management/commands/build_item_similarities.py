@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from services.similarity_service import build_item_similarities
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "customers also bought" item-to-item similarities from orders and wishlists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, help='Neighbours stored per product.')
+        parser.add_argument('--chunk-size', type=int, help='Products scored per sparse matrix block.')
+
+    def handle(self, *args, **options):
+        products, rows = build_item_similarities(
+            top_k=options['top_k'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} similarities for {products} products.'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from services.trending_service import compact_events
+
+
+class Command(BaseCommand):
+    help = 'Fold logged product events into decayed trend scores and refresh is_trending.'
+
+    def handle(self, *args, **options):
+        stats = compact_events()
+        if stats is None:
+            self.stdout.write(self.style.WARNING('Another compaction is running; nothing done.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {stats['events']} events: {stats['scored']} scores written, "
+            f"{stats['faded']} faded, is_trending +{stats['added']} / -{stats['removed']}; "
+            f"{stats['rows_written']} rows written in {stats['elapsed']:.3f}s."
+        ))
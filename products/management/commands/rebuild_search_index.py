@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from services import search_service
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index and keyword postings.'
+
+    def handle(self, *args, **options):
+        count = search_service.rebuild_index()
+        if search_service.get_backend() is None:
+            self.stdout.write(self.style.WARNING(
+                'No full-text index on this database; product search uses the LIKE fallback.'
+            ))
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products.'))
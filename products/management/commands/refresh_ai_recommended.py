@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from services.recommendation_service import refresh_ai_recommended_flag
+
+
+class Command(BaseCommand):
+    help = 'Flag the most-ordered products as ai_recommended, writing only rows whose flag changes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=12, help='Number of products to flag.')
+        parser.add_argument('--full', action='store_true', help='Recount order_count from order lines first.')
+
+    def handle(self, *args, **options):
+        stats = refresh_ai_recommended_flag(limit=options['limit'], full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Flagged +{stats['added']} / unflagged -{stats['removed']} products "
+            f"({stats['recounted']} counts corrected); {stats['rows_written']} rows written "
+            f"in {stats['elapsed']:.3f}s."
+        ))
@@ -0,0 +1,70 @@
+import logging
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+logger = logging.getLogger(__name__)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE products_product_fts USING fts5("
+                "name, description, brand, category, "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        except OperationalError as e:
+            # SQLite built without FTS5: search keeps using the LIKE fallback.
+            logger.warning('FTS5 unavailable, product search index not created: %s', e)
+            return
+
+        schema_editor.execute(
+            "INSERT INTO products_product_fts (rowid, name, description, brand, category) "
+            "SELECT p.id, p.name, p.description, p.brand, COALESCE(c.name, '') "
+            "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id"
+        )
+
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE products_product_search ("
+            "product_id bigint PRIMARY KEY REFERENCES products_product (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX products_product_search_document_gin "
+            "ON products_product_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO products_product_search (product_id, document) "
+            "SELECT p.id, "
+            "setweight(to_tsvector('simple', p.name), 'A') || "
+            "setweight(to_tsvector('simple', p.brand), 'B') || "
+            "setweight(to_tsvector('simple', COALESCE(c.name, '')), 'B') || "
+            "setweight(to_tsvector('simple', p.description), 'C') "
+            "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS products_product_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS products_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0002_productnegotiation_models"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
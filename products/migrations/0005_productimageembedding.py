@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductImageEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_name', models.CharField(max_length=255)),
+                ('feature_version', models.PositiveSmallIntegerField(default=1)),
+                ('vector', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='image_embedding', to='products.product')),
+            ],
+        ),
+    ]
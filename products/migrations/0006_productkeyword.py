@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:14
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _terms(text):
+    terms = set()
+    for token in re.findall(r'\w+', text.lower()):
+        if len(token) < 3:
+            continue
+        if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        terms.add(token[:64])
+    return terms
+
+
+def backfill_keywords(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductKeyword = apps.get_model('products', 'ProductKeyword')
+
+    batch = []
+    for product in Product.objects.select_related('category').iterator():
+        text = ' '.join([
+            product.name or '',
+            product.description or '',
+            product.brand or '',
+            product.category.name if product.category_id else '',
+        ])
+        batch.extend(ProductKeyword(product_id=product.pk, token=token) for token in _terms(text))
+        if len(batch) >= 1000:
+            ProductKeyword.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    if batch:
+        ProductKeyword.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_productimageembedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keywords', to='products.product')),
+            ],
+            options={
+                'unique_together': {('token', 'product')},
+            },
+        ),
+        migrations.RunPython(backfill_keywords, migrations.RunPython.noop),
+    ]
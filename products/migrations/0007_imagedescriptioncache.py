@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:15
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_productkeyword'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDescriptionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_hash', models.CharField(max_length=16, unique=True)),
+                ('band_0', models.PositiveIntegerField(db_index=True)),
+                ('band_1', models.PositiveIntegerField(db_index=True)),
+                ('band_2', models.PositiveIntegerField(db_index=True)),
+                ('band_3', models.PositiveIntegerField(db_index=True)),
+                ('description', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
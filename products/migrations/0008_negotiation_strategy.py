@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_imagedescriptioncache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='negotiation_strategy',
+            field=models.CharField(blank=True, choices=[('', 'Site default'), ('llm', 'AI assistant'), ('concession', 'Concession per attempt'), ('time_decay', 'Concession over time')], default='', max_length=20),
+        ),
+    ]
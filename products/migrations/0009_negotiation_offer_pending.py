@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_negotiation_strategy'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productnegotiationoffer',
+            name='decision',
+            field=models.CharField(choices=[('accept', 'Accept'), ('reject', 'Reject'), ('counter', 'Counter'), ('pending', 'Pending')], max_length=20),
+        ),
+    ]
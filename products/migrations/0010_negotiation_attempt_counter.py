@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def backfill_counters(apps, schema_editor):
+    ProductNegotiation = apps.get_model('products', 'ProductNegotiation')
+    ProductNegotiationOffer = apps.get_model('products', 'ProductNegotiationOffer')
+
+    offers = ProductNegotiationOffer.objects.filter(negotiation=OuterRef('pk'))
+    ProductNegotiation.objects.update(
+        attempt_count=Coalesce(
+            Subquery(
+                offers.order_by().values('negotiation').annotate(total=Count('id')).values('total')[:1]
+            ),
+            0,
+        ),
+        latest_offer=Subquery(offers.order_by('-created_at', '-id').values('id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_negotiation_offer_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productnegotiation',
+            name='attempt_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='productnegotiation',
+            name='latest_offer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productnegotiationoffer'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_negotiation_attempt_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='products.product')),
+                ('similar_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_from', to='products.product')),
+            ],
+            options={
+                'ordering': ['product', 'rank'],
+                'indexes': [models.Index(fields=['created_at'], name='products_pr_created_c3ccde_idx')],
+                'unique_together': {('product', 'rank')},
+            },
+        ),
+    ]
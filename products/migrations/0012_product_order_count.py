@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_count(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    OrderItem = apps.get_model('customers', 'OrderItem')
+
+    lines = OrderItem.objects.filter(product=OuterRef('pk'))
+    Product.objects.update(
+        order_count=Coalesce(
+            Subquery(lines.order_by().values('product').annotate(total=Count('id')).values('total')[:1]),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_productsimilarity'),
+        ('customers', '0007_userrecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='order_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_order_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_order_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTrend',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='products.product')),
+                ('score', models.FloatField(default=0.0)),
+                ('scored_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score'], name='products_pr_score_521a35_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('order', 'Order'), ('cart_add', 'Cart add'), ('wishlist', 'Wishlist'), ('view', 'Detail view')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='products.product')),
+            ],
+        ),
+    ]
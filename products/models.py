@@ -1,8 +1,18 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.text import slugify
 
 
+# Negotiation strategies selectable per seller or category (see
+# services.negotiation_strategies); empty means the site default.
+NEGOTIATION_STRATEGY_CHOICES = [
+    ('', 'Site default'),
+    ('llm', 'AI assistant'),
+    ('concession', 'Concession per attempt'),
+    ('time_decay', 'Concession over time'),
+]
+
 class Category(models.Model):
     """
     Product category model
@@ -12,6 +22,9 @@ class Category(models.Model):
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    negotiation_strategy = models.CharField(
+        max_length=20, choices=NEGOTIATION_STRATEGY_CHOICES, blank=True, default='',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -60,6 +73,9 @@ class Product(models.Model):
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
     num_reviews = models.IntegerField(default=0)
     
+    # Order lines placed for this product, kept current at checkout
+    order_count = models.PositiveIntegerField(default=0, db_index=True)
+    
     # AI features
     ai_recommended = models.BooleanField(default=False, help_text='AI recommended product')
     is_trending = models.BooleanField(default=False)
@@ -78,6 +94,9 @@ class Product(models.Model):
             models.Index(fields=['slug']),
             models.Index(fields=['category', '-created_at']),
             models.Index(fields=['-rating']),
+            # Keyset pagination seeks on (created_at, id) and (price, id)
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['price', 'id']),
         ]
     
     def save(self, *args, **kwargs):
@@ -102,6 +121,115 @@ class Product(models.Model):
         return self.name
 
 
+class ProductKeyword(models.Model):
+    """
+    Token -> product postings for keyword matching in visual search
+    (maintained by services.search_service)
+    """
+    token = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='keywords')
+
+    class Meta:
+        unique_together = ('token', 'product')
+
+    def __str__(self):
+        return f'{self.token} -> {self.product_id}'
+
+
+class ProductImageEmbedding(models.Model):
+    """
+    Visual feature vector of a product's main image, used for local
+    image similarity search (see services.image_index_service)
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='image_embedding')
+    image_name = models.CharField(max_length=255)
+    feature_version = models.PositiveSmallIntegerField(default=1)
+    vector = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Embedding({self.product_id})'
+
+
+class ProductSimilarity(models.Model):
+    """
+    Item-to-item "customers also bought" neighbours, best first
+    (built by services.similarity_service)
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similarities')
+    similar_product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_from')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['product', 'rank']
+        unique_together = ('product', 'rank')
+        indexes = [models.Index(fields=['created_at'])]
+
+    def __str__(self):
+        return f'{self.product_id} ~ {self.similar_product_id} ({self.score:.3f})'
+
+
+class ProductEvent(models.Model):
+    """
+    Append-only log of popularity signals. Rows are folded into
+    ProductTrend and deleted by services.trending_service.compact_events
+    """
+    KIND_ORDER = 'order'
+    KIND_CART_ADD = 'cart_add'
+    KIND_WISHLIST = 'wishlist'
+    KIND_VIEW = 'view'
+    KIND_CHOICES = [
+        (KIND_ORDER, 'Order'),
+        (KIND_CART_ADD, 'Cart add'),
+        (KIND_WISHLIST, 'Wishlist'),
+        (KIND_VIEW, 'Detail view'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.kind} {self.product_id} @ {self.created_at:%Y-%m-%d %H:%M}'
+
+
+class ProductTrend(models.Model):
+    """
+    Exponentially time-decayed popularity of a product, as of scored_at
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='trend')
+    score = models.FloatField(default=0.0)
+    scored_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['-score'])]
+
+    def __str__(self):
+        return f'{self.product_id}: {self.score:.3f}'
+
+
+class ImageDescriptionCache(models.Model):
+    """
+    Vision-model descriptions of uploaded search images, keyed by a 64-bit
+    perceptual hash. The hash is also stored as four 16-bit bands so
+    near-duplicate lookups can use indexes (see services.visual_search_service)
+    """
+    image_hash = models.CharField(max_length=16, unique=True)
+    band_0 = models.PositiveIntegerField(db_index=True)
+    band_1 = models.PositiveIntegerField(db_index=True)
+    band_2 = models.PositiveIntegerField(db_index=True)
+    band_3 = models.PositiveIntegerField(db_index=True)
+    description = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f'{self.image_hash}: {self.description}'
+
+
 class ProductReview(models.Model):
     """
     Product review model
@@ -136,6 +264,11 @@ class ProductNegotiation(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='negotiations')
     buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='product_negotiations')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    # Maintained by services.negotiation_service.record_offer
+    attempt_count = models.PositiveIntegerField(default=0)
+    latest_offer = models.ForeignKey(
+        'ProductNegotiationOffer', on_delete=models.SET_NULL, blank=True, null=True, related_name='+',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -151,10 +284,12 @@ class ProductNegotiationOffer(models.Model):
     DECISION_ACCEPT = 'accept'
     DECISION_REJECT = 'reject'
     DECISION_COUNTER = 'counter'
+    DECISION_PENDING = 'pending'
     DECISION_CHOICES = [
         (DECISION_ACCEPT, 'Accept'),
         (DECISION_REJECT, 'Reject'),
         (DECISION_COUNTER, 'Counter'),
+        (DECISION_PENDING, 'Pending'),
     ]
 
     negotiation = models.ForeignKey(ProductNegotiation, on_delete=models.CASCADE, related_name='offers')
@@ -0,0 +1,113 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from services import (
+    autocomplete_service,
+    cart_service,
+    facet_service,
+    image_index_service,
+    list_cache_service,
+    search_service,
+)
+
+from .models import Category, Product
+
+
+# Product fields that change which facet bucket a product is counted in
+FACET_FIELDS = {'is_available', 'price', 'category', 'category_id'} | search_service.INDEXED_FIELDS
+
+# Product fields that feed the cached cart subtotals
+CART_PRICE_FIELDS = {'price', 'discount_percentage'}
+
+# Product fields shown as typeahead suggestions
+AUTOCOMPLETE_FIELDS = {'name', 'brand', 'category', 'category_id', 'is_available'}
+
+
+def _touches(update_fields, fields):
+    return not update_fields or bool(set(update_fields) & fields)
+
+
+@receiver(post_save, sender=Product)
+def _product_update_search_index(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if not _touches(update_fields, search_service.INDEXED_FIELDS):
+        return
+
+    def _reindex():
+        search_service.index_product(instance)
+        search_service.update_keywords(instance)
+
+    transaction.on_commit(_reindex)
+
+
+@receiver(post_save, sender=Product)
+def _product_invalidate_facets(sender, instance, **kwargs):
+    if _touches(kwargs.get('update_fields'), FACET_FIELDS):
+        transaction.on_commit(facet_service.invalidate)
+
+
+@receiver(post_save, sender=Product)
+def _product_invalidate_product_lists(sender, instance, created, **kwargs):
+    if created or _touches(kwargs.get('update_fields'), list_cache_service.LIST_FIELDS):
+        transaction.on_commit(list_cache_service.invalidate)
+
+
+@receiver(post_save, sender=Product)
+def _product_update_autocomplete(sender, instance, **kwargs):
+    if _touches(kwargs.get('update_fields'), AUTOCOMPLETE_FIELDS):
+        transaction.on_commit(lambda: autocomplete_service.update_product(instance))
+
+
+@receiver(post_save, sender=Product)
+def _product_update_image_embedding(sender, instance, **kwargs):
+    if _touches(kwargs.get('update_fields'), {'main_image'}):
+        transaction.on_commit(lambda: image_index_service.index_product_image(instance))
+
+
+@receiver(post_save, sender=Product)
+def _product_refresh_cart_summaries(sender, instance, created, **kwargs):
+    if created or not _touches(kwargs.get('update_fields'), CART_PRICE_FIELDS):
+        return
+
+    from customers.models import Cart
+
+    product_id = instance.pk
+    transaction.on_commit(
+        lambda: cart_service.refresh_summaries(Cart.objects.filter(items__product_id=product_id))
+    )
+
+
+@receiver(pre_delete, sender=Product)
+def _product_refresh_carts_on_delete(sender, instance, **kwargs):
+    from customers.models import Cart
+
+    # Cart items go with the product, so find their carts before the cascade
+    cart_ids = list(Cart.objects.filter(items__product=instance).values_list('id', flat=True))
+    if cart_ids:
+        transaction.on_commit(lambda: cart_service.refresh_summaries(cart_ids))
+
+
+@receiver(post_delete, sender=Product)
+def _product_remove_from_search_index(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: search_service.remove_product(product_id))
+    transaction.on_commit(lambda: autocomplete_service.remove_product(product_id))
+    transaction.on_commit(facet_service.invalidate)
+    transaction.on_commit(image_index_service.mark_dirty)
+    transaction.on_commit(list_cache_service.invalidate)
+
+
+@receiver(post_save, sender=Category)
+def _category_reindex_products(sender, instance, created, **kwargs):
+    if created:
+        return
+
+    def _reindex():
+        for product in instance.products.select_related('category'):
+            search_service.index_product(product)
+            search_service.update_keywords(product)
+        facet_service.invalidate()
+        autocomplete_service.invalidate()
+
+    transaction.on_commit(_reindex)
@@ -1,3 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from PIL import Image
+
+from services import negotiation_service, search_service, visual_search_service
+
+from .models import Category, Product, ProductNegotiation, ProductNegotiationOffer
+
+
+class SearchNoResultsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user('seller')
+        category = Category.objects.create(name='Shoes')
+        Product.objects.create(
+            name='Running Shoe', description='Light trainer', category=category,
+            price=100, stock=5, seller=seller, sku='SHOE-1',
+        )
+
+    def test_zero_hit_search_keeps_rank_annotation(self):
+        results = search_service.search_products(Product.objects.all(), 'zzzz')
+        self.assertEqual(list(results.order_by('search_rank')), [])
+
+    def test_zero_hit_search_page_renders(self):
+        response = self.client.get(reverse('products:list'), {'q': 'zzzz'})
+        self.assertEqual(response.status_code, 200)
+
+
+class VisualSearchKeywordFallbackTests(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user('seller')
+        category = Category.objects.create(name='Accessories')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.belt = Product.objects.create(
+                name='Leather Belt', description='Brown strap', category=category,
+                price=30, stock=5, seller=seller, sku='BELT-1',
+            )
+            self.wallet = Product.objects.create(
+                name='Leather Wallet', description='Slim bifold, brown', category=category,
+                price=50, stock=5, seller=seller, sku='WAL-1',
+            )
+            Product.objects.create(
+                name='Canvas Wallet', description='Zip pouch with a new design', category=category,
+                price=20, stock=5, seller=seller, sku='WAL-2',
+            )
+
+    def _search(self, description):
+        image = Image.new('RGB', (8, 8))
+        with mock.patch.object(visual_search_service, 'find_visually_similar', return_value=[]), \
+                mock.patch.object(visual_search_service, 'describe_image', return_value=description):
+            return visual_search_service.find_similar_products(image)
+
+    def test_ranks_products_meeting_threshold_by_overlap(self):
+        # 4 keywords: a match needs at least 2; the canvas wallet only shares 'wallet'
+        products, description = self._search('slim brown leather wallet')
+        self.assertEqual(description, 'slim brown leather wallet')
+        self.assertEqual(products, [self.wallet, self.belt])
+
+    def test_stop_words_do_not_count_as_hits(self):
+        products, _description = self._search('a wallet with the new design')
+        self.assertEqual(products, [])
+
+
+class RecordOfferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user('seller')
+        buyer = User.objects.create_user('buyer')
+        category = Category.objects.create(name='Furniture')
+        product = Product.objects.create(
+            name='Oak Chair', description='Solid oak', category=category,
+            price=200, stock=5, seller=seller, sku='CHAIR-1',
+        )
+        cls.negotiation = ProductNegotiation.objects.create(product=product, buyer=buyer)
+
+    def _record(self, decision):
+        # A fresh copy per call, like two requests that read the row before either wrote
+        negotiation = ProductNegotiation.objects.get(pk=self.negotiation.pk)
+        return negotiation_service.record_offer(negotiation, offer_price=150, decision=decision)
+
+    def test_second_offer_rejected_while_one_is_pending(self):
+        first = self._record(ProductNegotiationOffer.DECISION_PENDING)
+        second = self._record(ProductNegotiationOffer.DECISION_PENDING)
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        self.assertEqual(ProductNegotiationOffer.objects.count(), 1)
+        self.assertEqual(ProductNegotiation.objects.get(pk=self.negotiation.pk).attempt_count, 1)
 
-# Create your tests here.
+    def test_decided_offer_allows_the_next(self):
+        self._record(ProductNegotiationOffer.DECISION_COUNTER)
+        self.assertIsNotNone(self._record(ProductNegotiationOffer.DECISION_PENDING))
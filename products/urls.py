@@ -15,5 +15,6 @@ urlpatterns = [
 
     # Product Detail (view single product)
     path('<slug:slug>/negotiate/', views.negotiate_view, name='negotiate'),
+    path('<slug:slug>/negotiate/status/', views.negotiate_status_view, name='negotiate_status'),
     path('<slug:slug>/', views.product_detail_view, name='detail'),
 ]
\ No newline at end of file
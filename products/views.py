@@ -1,64 +1,68 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Q, Count  # <--- Added Count here
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from decimal import Decimal, ROUND_HALF_UP
 from customers.models import NegotiatedOrder
-from .models import Product, Category
+from .models import Product, ProductEvent, Category
 from .forms import ProductForm, NegotiationOfferForm
 from .models import ProductNegotiation, ProductNegotiationOffer
-from services.llama_service import negotiate_price
+from services import negotiation_service
+from services.negotiation_service import negotiation_prices
+from services.negotiation_strategies import strategy_for_product
+from services.search_service import search_products
+from services.similarity_service import get_also_bought
+from services.facet_service import get_facets, parse_price_range, price_filter
+from core.pagination import paginate
 from products.models import ProductNegotiation, ProductNegotiationOffer
+from django.db import transaction
+from django.http import JsonResponse
+from django.urls import reverse
 from django.utils import timezone
 
 # Public View: List all products
 def product_list_view(request):
     products = Product.objects.filter(is_available=True)
-    
-    # FIX: Annotate category with the count of AVAILABLE products only
-    categories = Category.objects.annotate(
-        items_count=Count('products', filter=Q(products__is_available=True))
-    ).all()
 
-    # Search
+    # Search (full-text index, ranked by relevance)
     query = request.GET.get('q')
     if query:
-        products = products.filter(
-            Q(name__icontains=query) | 
-            Q(description__icontains=query)
-        )
+        products = search_products(products, query)
 
-    # Category Filter
+    # Facet counts for the search results (cached per filter set)
     selected_categories = request.GET.getlist('category')
+    price_range = request.GET.get('price_range')
+    facets = get_facets(
+        products,
+        query=query,
+        selected_categories=selected_categories,
+        price_range=price_range,
+    )
+
+    # Category Filter
     if selected_categories:
         products = products.filter(category__slug__in=selected_categories)
 
     # Price Range Filter
-    price_range = request.GET.get('price_range')
-    if price_range:
-        if '-' in price_range:
-            if 'plus' in price_range:
-                min_price = int(price_range.split('-')[0])
-                products = products.filter(price__gte=min_price)
-            else:
-                min_price, max_price = map(int, price_range.split('-'))
-                products = products.filter(price__gte=min_price, price__lte=max_price)
+    price_bounds = parse_price_range(price_range)
+    if price_bounds:
+        products = products.filter(price_filter(price_bounds))
 
-    # Sorting
-    sort_by = request.GET.get('sort', '-created_at')
+    # Sorting (search results default to relevance order)
+    sort_by = request.GET.get('sort') or ('relevance' if query else '-created_at')
+    ordering = None
     if sort_by == 'price':
-        products = products.order_by('price')
+        ordering = ('price', 'id')
     elif sort_by == '-price':
-        products = products.order_by('-price')
+        ordering = ('-price', '-id')
+    elif sort_by == 'relevance' and query:
+        # Rank order cannot be seeked, so relevance uses page numbers
+        products = products.order_by('search_rank', '-created_at')
     else:
-        products = products.order_by('-created_at')
+        ordering = ('-created_at', '-id')
 
-    # Pagination
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination (keyset cursors for the sortable orderings)
+    page_obj = paginate(request, products, per_page=12, ordering=ordering)
 
     products_data = []
     for p in page_obj:
@@ -76,11 +80,16 @@ def product_list_view(request):
             }
         )
 
+    categories = list(Category.objects.all())
+    for category in categories:
+        category.items_count = facets['categories'].get(category.id, 0)
+
     context = {
         'products': page_obj,
         'categories': categories,
         'selected_categories': selected_categories,
-        'total_count': products.count(),
+        'price_facets': facets['price_buckets'],
+        'total_count': facets['total'],
         'products_data': products_data,
     }
     return render(request, 'products/list.html', context)
@@ -93,6 +102,7 @@ def product_detail_view(request, slug):
     Display detailed view of a single product with recommendations
     """
     from services.recommendation_service import get_recommendations_for_user, get_recommendations_for_guest
+    from services.trending_service import record_event
 
     product = get_object_or_404(
         Product.objects.select_related('category', 'seller'),
@@ -100,6 +110,8 @@ def product_detail_view(request, slug):
         is_available=True
     )
     
+    record_event(product.id, ProductEvent.KIND_VIEW)
+
     # Related products from same category (existing logic — keep this)
     related_products = Product.objects.filter(
         category=product.category,
@@ -116,6 +128,9 @@ def product_detail_view(request, slug):
 
     # Exclude the current product from recommendations
     recommended_products = [p for p in recommended_products if p.id != product.id]
+
+    # Customers also bought (item-to-item similarities from the batch job)
+    also_bought = get_also_bought(product, limit=4)
     
     # Reviews
     reviews = product.reviews.all().select_related('user')[:10]
@@ -125,6 +140,7 @@ def product_detail_view(request, slug):
         'related_products': related_products,
         'recommended_products': recommended_products,
         'recommendation_label': recommendation_label,
+        'also_bought': also_bought,
         'reviews': reviews,
     }
     
@@ -134,7 +150,7 @@ def product_detail_view(request, slug):
 @login_required
 def negotiate_view(request, slug):
     product = get_object_or_404(
-        Product.objects.select_related('category', 'seller'),
+        Product.objects.select_related('category', 'seller', 'seller__seller_profile'),
         slug=slug,
         is_available=True,
     )
@@ -143,22 +159,18 @@ def negotiate_view(request, slug):
         messages.error(request, 'You cannot negotiate on your own product.')
         return redirect('products:detail', slug=product.slug)
 
-    negotiation, _created = ProductNegotiation.objects.get_or_create(
+    negotiation, _created = ProductNegotiation.objects.select_related('latest_offer').get_or_create(
         product=product,
         buyer=request.user,
         defaults={'status': ProductNegotiation.STATUS_OPEN},
     )
 
-    offers_qs = negotiation.offers.all()
-    attempts = offers_qs.count()
+    attempts = negotiation.attempt_count
+    latest_offer = negotiation.latest_offer
+    is_pending = bool(latest_offer and latest_offer.decision == ProductNegotiationOffer.DECISION_PENDING)
 
-    try:
-        min_price = (product.price * (Decimal('1') - Decimal(str(settings.MAX_NEGOTIATION_DISCOUNT))))
-    except Exception:
-        min_price = product.price
-
-    min_price = min_price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-    listed_price = Decimal(str(product.price)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    listed_price, min_price = negotiation_prices(product)
+    max_attempts = negotiation_service.max_attempts()
 
     form = NegotiationOfferForm()
 
@@ -168,8 +180,7 @@ def negotiate_view(request, slug):
             if negotiation.status != ProductNegotiation.STATUS_OPEN:
                 return redirect('products:negotiate', slug=product.slug)
 
-            attempts = negotiation.offers.count()
-            if attempts >= int(getattr(settings, 'MAX_NEGOTIATION_ATTEMPTS', 3)):
+            if is_pending or attempts >= max_attempts:
                 return redirect('products:negotiate', slug=product.slug)
 
             offer = form.cleaned_data['offer']
@@ -189,94 +200,59 @@ def negotiate_view(request, slug):
                 decision = ProductNegotiationOffer.DECISION_COUNTER
                 counter_price = min_price
             else:
-                result = negotiate_price(
-                    product_price=listed_price,
+                strategy = strategy_for_product(product)
+                if strategy.remote and getattr(settings, 'NEGOTIATION_ASYNC', True):
+                    # Decide on the worker pool; the page polls negotiate_status
+                    with transaction.atomic():
+                        pending_offer = negotiation_service.record_offer(
+                            negotiation,
+                            offer_price=offer,
+                            decision=ProductNegotiationOffer.DECISION_PENDING,
+                        )
+                        if pending_offer is not None:
+                            negotiation_service.submit_offer(pending_offer.pk)
+                    return redirect('products:negotiate', slug=product.slug)
+
+                result = strategy.decide(
+                    listed_price=listed_price,
                     min_price=min_price,
                     offer=offer,
+                    attempt=attempts + 1,
+                    max_attempts=max_attempts,
+                    started_at=negotiation.created_at,
                 )
                 decision = result.get('decision')
                 counter_price = result.get('counter_price')
                 raw_ai_output = result.get('raw_output') or ''
 
-            if decision == ProductNegotiationOffer.DECISION_ACCEPT:
-                if offer < min_price:
-                    decision = ProductNegotiationOffer.DECISION_COUNTER
-                    counter_price = min_price
-            elif decision == ProductNegotiationOffer.DECISION_COUNTER:
-                try:
-                    counter_price = Decimal(str(counter_price)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                except (InvalidOperation, TypeError):
-                    counter_price = ((offer + listed_price) / 2).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-                if counter_price < min_price:
-                    counter_price = min_price
-                if counter_price > listed_price:
-                    counter_price = listed_price
-            elif decision != ProductNegotiationOffer.DECISION_REJECT:
-                decision = ProductNegotiationOffer.DECISION_COUNTER
-                counter_price = ((offer + listed_price) / 2).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                if counter_price < min_price:
-                    counter_price = min_price
-                if counter_price > listed_price:
-                    counter_price = listed_price
-
-            ProductNegotiationOffer.objects.create(
-                negotiation=negotiation,
-                offer_price=offer,
+            decision, counter_price = negotiation_service.normalize_decision(
                 decision=decision,
                 counter_price=counter_price,
-                raw_ai_output=raw_ai_output,
+                offer=offer,
+                listed_price=listed_price,
+                min_price=min_price,
             )
 
-            if decision == ProductNegotiationOffer.DECISION_ACCEPT:
-                negotiation.status = ProductNegotiation.STATUS_ACCEPTED
-                negotiation.save(update_fields=['status', 'updated_at'])
-
-                pending = NegotiatedOrder.objects.filter(
-                    buyer=request.user,
-                    product=product,
-                    status=NegotiatedOrder.STATUS_PENDING,
-                ).order_by('-created_at').first()
-
-                if pending and pending.expires_at and pending.expires_at <= timezone.now():
-                    pending.status = NegotiatedOrder.STATUS_CANCELLED
-                    pending.save(update_fields=['status'])
-                    pending = None
-
-                if pending and pending.negotiated_price != offer:
-                    pending.status = NegotiatedOrder.STATUS_CANCELLED
-                    pending.save(update_fields=['status'])
-                    pending = None
-
-                if not pending:
-                    pending = NegotiatedOrder.objects.create(
-                        buyer=request.user,
-                        product=product,
-                        negotiated_price=offer,
-                        status=NegotiatedOrder.STATUS_PENDING,
-                    )
+            with transaction.atomic():
+                recorded = negotiation_service.record_offer(
+                    negotiation,
+                    offer_price=offer,
+                    decision=decision,
+                    counter_price=counter_price,
+                    raw_ai_output=raw_ai_output,
+                )
+                if recorded is None:
+                    return redirect('products:negotiate', slug=product.slug)
+                pending = negotiation_service.apply_decision(negotiation, decision, offer)
 
+            if pending is not None:
                 return redirect('checkout_with_negotiation', order_id=pending.id)
 
-            elif decision == ProductNegotiationOffer.DECISION_REJECT:
-                # Only permanently close the negotiation if all attempts are exhausted
-                attempts_after = negotiation.offers.count()
-                max_attempts = int(getattr(settings, 'MAX_NEGOTIATION_ATTEMPTS', 3))
-
-                if attempts_after >= max_attempts:
-                    negotiation.status = ProductNegotiation.STATUS_REJECTED
-                    negotiation.save(update_fields=['status', 'updated_at'])
-                else:
-                    negotiation.save(update_fields=['updated_at'])
-            else:
-                negotiation.save(update_fields=['updated_at'])
-
             return redirect('products:negotiate', slug=product.slug)
 
         return redirect('products:negotiate', slug=product.slug)
 
-    offers = offers_qs
-    latest_offer = offers.last()
+    offers = negotiation.offers.all()
 
     negotiated_order = None
     if negotiation.status == ProductNegotiation.STATUS_ACCEPTED:
@@ -289,7 +265,9 @@ def negotiate_view(request, slug):
     form_disabled = False
     if negotiation.status != ProductNegotiation.STATUS_OPEN:
         form_disabled = True
-    if attempts >= int(getattr(settings, 'MAX_NEGOTIATION_ATTEMPTS', 3)):
+    if attempts >= max_attempts:
+        form_disabled = True
+    if is_pending:
         form_disabled = True
 
     context = {
@@ -298,9 +276,10 @@ def negotiate_view(request, slug):
         'min_price': min_price,
         'listed_price': listed_price,
         'attempts': attempts,
-        'max_attempts': int(getattr(settings, 'MAX_NEGOTIATION_ATTEMPTS', 3)),
+        'max_attempts': max_attempts,
         'offers': offers,
         'latest_offer': latest_offer,
+        'is_pending': is_pending,
         'negotiated_order': negotiated_order,
         'form': form,
         'form_disabled': form_disabled,
@@ -308,6 +287,45 @@ def negotiate_view(request, slug):
     return render(request, 'products/negotiate.html', context)
 
 
+@login_required
+def negotiate_status_view(request, slug):
+    """
+    Current state of the buyer's negotiation (JSON), polled by the negotiate
+    page while an offer is being decided in the background.
+    """
+    negotiation = get_object_or_404(
+        ProductNegotiation.objects.select_related('product', 'latest_offer'),
+        product__slug=slug,
+        buyer=request.user,
+    )
+    latest_offer = negotiation.latest_offer
+    is_pending = bool(latest_offer and latest_offer.decision == ProductNegotiationOffer.DECISION_PENDING)
+
+    if is_pending:
+        # Re-queue offers whose worker was lost (e.g. a process restart)
+        timeout = int(getattr(settings, 'NEGOTIATION_PENDING_TIMEOUT', 30))
+        if (timezone.now() - latest_offer.created_at).total_seconds() > timeout:
+            negotiation_service.submit_offer(latest_offer.pk)
+
+    redirect_url = None
+    if negotiation.status == ProductNegotiation.STATUS_ACCEPTED:
+        negotiated_order = NegotiatedOrder.objects.filter(
+            buyer=request.user,
+            product=negotiation.product,
+            status=NegotiatedOrder.STATUS_PENDING,
+        ).order_by('-created_at').first()
+        if negotiated_order:
+            redirect_url = reverse('checkout_with_negotiation', kwargs={'order_id': negotiated_order.id})
+
+    return JsonResponse({
+        'status': negotiation.status,
+        'pending': is_pending,
+        'decision': latest_offer.decision if latest_offer else None,
+        'counter_price': str(latest_offer.counter_price) if latest_offer and latest_offer.counter_price else None,
+        'redirect_url': redirect_url,
+    })
+
+
 @login_required
 def product_create_view(request):
     """
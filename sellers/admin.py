@@ -17,7 +17,7 @@ class SellerProfileAdmin(admin.ModelAdmin):
             'fields': ('phone', 'email', 'address', 'city')
         }),
         ('Business Details', {
-            'fields': ('tax_id', 'bank_account')
+            'fields': ('tax_id', 'bank_account', 'negotiation_strategy')
         }),
         ('Stats & Status', {
             'fields': ('rating', 'total_sales', 'total_revenue', 'is_active')
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0006_remove_sellerprofile_is_verified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='negotiation_strategy',
+            field=models.CharField(blank=True, choices=[('', 'Site default'), ('llm', 'AI assistant'), ('concession', 'Concession per attempt'), ('time_decay', 'Concession over time')], default='', help_text="Overrides the category's strategy when set", max_length=20),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from products.models import Product
+from products.models import NEGOTIATION_STRATEGY_CHOICES, Product
 # Import Order from customers to use the single source of truth
 from customers.models import Order
 
@@ -30,6 +30,12 @@ class SellerProfile(models.Model):
     total_sales = models.IntegerField(default=0)
     total_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0.0)
     
+    # Price negotiation
+    negotiation_strategy = models.CharField(
+        max_length=20, choices=NEGOTIATION_STRATEGY_CHOICES, blank=True, default='',
+        help_text="Overrides the category's strategy when set",
+    )
+    
     # Status
     is_active = models.BooleanField(default=True)
     
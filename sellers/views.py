@@ -2,7 +2,6 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q
-from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.urls import reverse
@@ -12,6 +11,7 @@ from django.utils.http import url_has_allowed_host_and_scheme
 from products.models import Product, Category
 from .models import SellerProfile, Order
 from products.forms import ProductForm
+from core.pagination import paginate
 
 
 @login_required
@@ -44,25 +44,23 @@ def dashboard_view(request):
     elif stock_status == 'inactive':
         products_list = products_list.filter(is_available=False)
 
-    # Sorting
+    # Sorting (the id tie-breaker keeps keyset pagination stable)
     sort_by = request.GET.get('sort', '-created_at')
     if sort_by == 'price_asc':
-        products_list = products_list.order_by('price')
+        ordering = ('price', 'id')
     elif sort_by == 'price_desc':
-        products_list = products_list.order_by('-price')
+        ordering = ('-price', '-id')
     elif sort_by == 'stock_asc':
-        products_list = products_list.order_by('stock')
+        ordering = ('stock', 'id')
     elif sort_by == 'stock_desc':
-        products_list = products_list.order_by('-stock')
+        ordering = ('-stock', '-id')
     elif sort_by == 'date_asc':
-        products_list = products_list.order_by('created_at')
+        ordering = ('created_at', 'id')
     else: # date_desc or default
-        products_list = products_list.order_by('-created_at')
+        ordering = ('-created_at', '-id')
     
-    # Pagination
-    paginator = Paginator(products_list, 12) # Show 12 products per page
-    page_number = request.GET.get('page')
-    products = paginator.get_page(page_number)
+    # Pagination: 12 products per page, keyset cursors by default
+    products = paginate(request, products_list, per_page=12, ordering=ordering)
     
     # Get seller's orders (seller isolation via OrderItem -> Product.seller)
     orders = (
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+KIND_PRODUCT = 'product'
+KIND_BRAND = 'brand'
+KIND_CATEGORY = 'category'
+
+
+def _normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def _product_terms(name, brand, category_name):
+    """(kind, display text) pairs a product contributes to the index."""
+    terms = []
+    if name:
+        terms.append((KIND_PRODUCT, name.strip()))
+    if brand:
+        terms.append((KIND_BRAND, brand.strip()))
+    if category_name:
+        terms.append((KIND_CATEGORY, category_name.strip()))
+    return terms
+
+
+class PrefixIndex:
+    """
+    In-memory typeahead index: a sorted array of (key, kind, display) entries
+    searched with bisect. Every word suffix of a term is a key, so
+    "lap" finds "Gaming Laptop" as well as "Laptop Bag".
+
+    Brands and categories are shared by many products, so terms are
+    reference-counted and only leave the array when the last product
+    contributing them goes away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._term_refs = Counter()
+        self._product_terms = {}
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _keys(kind, display):
+        words = _normalize(display).split(' ')
+        return [(' '.join(words[i:]), kind, display) for i in range(len(words)) if words[i]]
+
+    def _add_term(self, term):
+        self._term_refs[term] += 1
+        if self._term_refs[term] == 1:
+            for entry in self._keys(*term):
+                insort(self._entries, entry)
+
+    def _remove_term(self, term):
+        self._term_refs[term] -= 1
+        if self._term_refs[term] > 0:
+            return
+        del self._term_refs[term]
+        for entry in self._keys(*term):
+            i = bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+    def load(self, rows):
+        """Replace the contents with rows of (product_id, name, brand, category_name)."""
+        term_refs = Counter()
+        product_terms = {}
+        for product_id, name, brand, category_name in rows:
+            terms = _product_terms(name, brand, category_name)
+            product_terms[product_id] = terms
+            term_refs.update(terms)
+
+        entries = sorted(
+            entry
+            for term in term_refs
+            for entry in self._keys(*term)
+        )
+
+        with self._lock:
+            self._entries = entries
+            self._term_refs = term_refs
+            self._product_terms = product_terms
+            self.built_at = time.monotonic()
+
+    def update_product(self, product_id, name, brand, category_name):
+        terms = _product_terms(name, brand, category_name)
+        with self._lock:
+            for term in self._product_terms.pop(product_id, []):
+                self._remove_term(term)
+            for term in terms:
+                self._add_term(term)
+            self._product_terms[product_id] = terms
+
+    def remove_product(self, product_id):
+        with self._lock:
+            for term in self._product_terms.pop(product_id, []):
+                self._remove_term(term)
+
+    def suggest(self, prefix, limit=8):
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            i = bisect_left(self._entries, (prefix,))
+            while i < len(self._entries) and len(results) < limit:
+                key, kind, display = self._entries[i]
+                if not key.startswith(prefix):
+                    break
+                if (kind, display) not in seen:
+                    seen.add((kind, display))
+                    results.append({'text': display, 'kind': kind})
+                i += 1
+        return results
+
+
+_index = PrefixIndex()
+_build_lock = threading.Lock()
+
+
+def _load_index():
+    from products.models import Product
+
+    rows = (
+        Product.objects.filter(is_available=True)
+        .values_list('id', 'name', 'brand', 'category__name')
+    )
+    _index.load(rows.iterator())
+    logger.info('Autocomplete index built with %s entries', len(_index))
+
+
+def _ensure_built():
+    # Changes made in other processes only reach this one on the periodic rebuild
+    max_age = int(getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', 600))
+    built_at = _index.built_at
+    if built_at is not None and time.monotonic() - built_at < max_age:
+        return
+
+    with _build_lock:
+        if _index.built_at == built_at:
+            _load_index()
+
+
+def suggest(prefix, limit=8):
+    """Return up to `limit` product/brand/category suggestions for a typed prefix."""
+    _ensure_built()
+    return _index.suggest(prefix, limit=limit)
+
+
+def update_product(product):
+    """Apply a single product change to the index (no-op until the index is built)."""
+    if _index.built_at is None:
+        return
+
+    if not product.is_available:
+        _index.remove_product(product.pk)
+        return
+
+    category_name = product.category.name if product.category_id else ''
+    _index.update_product(product.pk, product.name, product.brand, category_name)
+
+
+def remove_product(product_id):
+    if _index.built_at is not None:
+        _index.remove_product(product_id)
+
+
+def invalidate():
+    """Force a full rebuild on the next lookup (e.g. after a category rename)."""
+    _index.built_at = None
@@ -0,0 +1,162 @@
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+_ZERO = Decimal('0.00')
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def line_total(prefix=''):
+    """
+    Discounted line price as a SQL expression:
+    price * (100 - discount_percentage) * quantity / 100.
+    `prefix` is the path from the queried model to CartItem (e.g. 'items__').
+    """
+    return ExpressionWrapper(
+        F(f'{prefix}product__price')
+        * (100 - F(f'{prefix}product__discount_percentage'))
+        * F(f'{prefix}quantity')
+        # Multiply rather than divide: SQLite does integer division on whole-number prices
+        * Value(Decimal('0.01')),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def summarize(cart_id):
+    """{'total_items', 'subtotal'} for a cart, computed in one aggregate query."""
+    from customers.models import CartItem
+
+    totals = CartItem.objects.filter(cart_id=cart_id).aggregate(
+        total_items=Sum('quantity'),
+        subtotal=Sum(line_total()),
+    )
+    return {
+        'total_items': totals['total_items'] or 0,
+        'subtotal': _money(totals['subtotal']),
+    }
+
+
+def lock_cart(customer):
+    """
+    The customer's Cart, row-locked until the current transaction ends, so
+    concurrent changes to one cart and their summary refreshes apply one at
+    a time. Call inside transaction.atomic().
+    """
+    from customers.models import Cart
+
+    return Cart.objects.select_for_update().get(customer=customer)
+
+
+def refresh_summary(cart):
+    """
+    Recompute and store `cart`'s cached total_items and subtotal after its
+    items changed. Returns the summary.
+    """
+    from customers.models import Cart
+
+    summary = summarize(cart.pk)
+    Cart.objects.filter(pk=cart.pk).update(**summary)
+    cart.total_items = summary['total_items']
+    cart.subtotal = summary['subtotal']
+    return summary
+
+
+def refresh_summaries(carts):
+    """
+    Recompute the cached summary of every cart in `carts` (a queryset or
+    ids) with a single UPDATE, e.g. after a product's price changed.
+    """
+    from customers.models import Cart, CartItem
+
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    return Cart.objects.filter(pk__in=carts).update(
+        total_items=Coalesce(Subquery(items.annotate(total=Sum('quantity')).values('total')[:1]), 0),
+        subtotal=Coalesce(
+            Subquery(items.annotate(total=Sum(line_total())).values('total')[:1]),
+            Value(_ZERO),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+def apply_operations(cart, operations):
+    """
+    Apply a batch of (item_id, delta) quantity changes to `cart` in one
+    transaction. The cart's items and their products' stock are read with a
+    single locking query; quantities are capped at the stock on hand and
+    items that drop to zero are removed. Returns the resulting cart state:
+    {'items', 'removed', 'messages', 'cart_total', 'cart_count'}.
+    """
+    from customers.models import CartItem
+
+    deltas = {}
+    for item_id, delta in operations:
+        deltas[item_id] = deltas.get(item_id, 0) + delta
+
+    notes = []
+    removed = []
+    changed = []
+    with transaction.atomic():
+        items = list(
+            CartItem.objects.select_for_update(of=('self',))
+            .filter(cart=cart)
+            .select_related('product')
+            .order_by('id')
+        )
+        by_id = {item.id: item for item in items}
+
+        for item_id, delta in deltas.items():
+            item = by_id.get(item_id)
+            if item is None:
+                notes.append('Item not found in cart')
+                continue
+            if not delta:
+                continue
+
+            quantity = item.quantity + delta
+            if quantity <= 0:
+                removed.append(item.id)
+                continue
+            if quantity > item.product.stock:
+                notes.append(f'Only {item.product.stock} of {item.product.name} available in stock')
+                quantity = max(item.product.stock, 0)
+                if quantity == 0:
+                    removed.append(item.id)
+                    continue
+            if quantity != item.quantity:
+                item.quantity = quantity
+                item.updated_at = timezone.now()
+                changed.append(item)
+
+        if removed:
+            CartItem.objects.filter(id__in=removed).delete()
+        if changed:
+            CartItem.objects.bulk_update(changed, ['quantity', 'updated_at'])
+        summary = refresh_summary(cart) if removed or changed else summarize(cart.pk)
+
+    return {
+        'items': [
+            {
+                'id': item.id,
+                'quantity': item.quantity,
+                'item_total': float(item.get_total_price()),
+                'max_stock': item.product.stock,
+            }
+            for item in items
+            if item.id not in removed
+        ],
+        'removed': removed,
+        'messages': notes,
+        'cart_total': float(summary['subtotal']),
+        'cart_count': summary['total_items'],
+    }
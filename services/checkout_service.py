@@ -0,0 +1,196 @@
+import logging
+import re
+import uuid
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from services import order_number_service, recommendation_service, trending_service
+
+
+logger = logging.getLogger(__name__)
+
+_CHECKOUT_KEY_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class OutOfStock(Exception):
+    """Raised when a checkout asks for more units than a product has in stock."""
+
+    def __init__(self, products):
+        self.products = products
+        names = ', '.join(product.name for product in products)
+        super().__init__(f'Not enough stock for: {names}')
+
+
+def issue_checkout_key():
+    """A fresh idempotency key to embed in a checkout form."""
+    return uuid.uuid4().hex
+
+
+def clean_checkout_key(key):
+    """
+    The idempotency key posted with a checkout form, or a fresh one when it
+    is missing or not a key we issued.
+    """
+    if key and _CHECKOUT_KEY_RE.match(key):
+        return key
+    return issue_checkout_key()
+
+
+def find_batch(customer, key):
+    """The OrderBatch already placed with `key`, if any."""
+    from customers.models import OrderBatch
+
+    if not key:
+        return None
+    return OrderBatch.objects.filter(customer=customer, idempotency_key=key).first()
+
+
+def claim_batch(customer, key):
+    """
+    Create the OrderBatch for `key` in the current transaction. Returns None
+    when the key was already used: the unique constraint makes a concurrent
+    duplicate wait for the first submission and then fail here.
+    """
+    from customers.models import OrderBatch
+
+    try:
+        with transaction.atomic():
+            return OrderBatch.objects.create(customer=customer, idempotency_key=key)
+    except IntegrityError:
+        return None
+
+
+def _reserve_stock(products, quantities):
+    """
+    Decrement stock for every product in one conditional UPDATE. Each row
+    only matches while it still has enough units, so a short count means
+    another checkout got there first.
+    """
+    from products.models import Product
+
+    enough = Q()
+    for product_id, quantity in quantities.items():
+        enough |= Q(id=product_id, stock__gte=quantity)
+
+    reserved = Product.objects.filter(enough).update(
+        stock=F('stock') - Case(
+            *(When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    if reserved != len(quantities):
+        raise OutOfStock([p for p in products if p.stock < quantities[p.id]] or products)
+
+
+def place_orders(customer, lines, *, shipping_address, payment_method='cod', batch=None):
+    """
+    Turn `lines` of (product_id, quantity, unit_price) into one pending
+    Order per seller. unit_price None means the product's current
+    discounted price. An unsaved shipping_address is only snapshotted onto
+    the orders; `batch` is the OrderBatch they belong to.
+
+    The products are locked with one SELECT ... FOR UPDATE in id order (so
+    concurrent checkouts of overlapping carts cannot deadlock), stock is
+    reserved with a single conditional UPDATE, and orders and items are
+    written with bulk_create, so the query count does not grow with the
+    number of lines. Raises OutOfStock (rolling everything back) when any
+    product is short. Returns the created orders.
+    """
+    from customers.models import Order, OrderItem
+    from products.models import Product, ProductEvent
+
+    quantities = OrderedDict()
+    prices = {}
+    for product_id, quantity, unit_price in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+        if unit_price is not None:
+            prices[product_id] = unit_price
+    if not quantities:
+        return []
+
+    with transaction.atomic():
+        locked = {
+            product.id: product
+            for product in Product.objects.select_for_update().filter(id__in=quantities).order_by('id')
+        }
+        products = [locked[pid] for pid in quantities if pid in locked]
+        if len(products) != len(quantities):
+            raise Product.DoesNotExist('A product in this order no longer exists.')
+
+        short = [p for p in products if p.stock < quantities[p.id]]
+        if short:
+            raise OutOfStock(short)
+        _reserve_stock(products, quantities)
+
+        by_seller = OrderedDict()
+        for product in products:
+            by_seller.setdefault(product.seller_id, []).append(product)
+
+        orders = []
+        items = []
+        for seller_id, seller_products in by_seller.items():
+            order_items = []
+            for product in seller_products:
+                price = prices.get(product.id, product.get_discount_price())
+                quantity = quantities[product.id]
+                order_items.append(OrderItem(
+                    product=product,
+                    product_name=product.name,
+                    product_sku=product.sku,
+                    product_image=product.main_image,
+                    price=price,
+                    quantity=quantity,
+                    subtotal=price * quantity,
+                ))
+
+            subtotal = sum(item.subtotal for item in order_items)
+            tax = 0
+            orders.append(Order(
+                customer=customer,
+                seller_id=seller_id,
+                status='pending',
+                payment_method=payment_method,
+                batch=batch,
+                shipping_address=shipping_address if shipping_address.pk else None,
+                # Snapshot the address details in case the address object changes/deletes later
+                shipping_full_name=shipping_address.full_name,
+                shipping_phone=shipping_address.phone,
+                shipping_address_line_1=shipping_address.address_line_1,
+                shipping_address_line_2=shipping_address.address_line_2,
+                shipping_city=shipping_address.city,
+                shipping_state=shipping_address.state,
+                shipping_postal_code=shipping_address.postal_code,
+                shipping_country=shipping_address.country,
+                subtotal=subtotal,
+                tax=tax,
+                total=subtotal + tax,
+            ))
+            items.append(order_items)
+
+        for order, number in zip(orders, order_number_service.generate(len(orders))):
+            order.order_number = number
+        Order.objects.bulk_create(orders)
+        if orders[0].pk is None:
+            # Backends without INSERT ... RETURNING: look the ids up in one query
+            ids = dict(
+                Order.objects.filter(order_number__in=[o.order_number for o in orders])
+                .values_list('order_number', 'id')
+            )
+            for order in orders:
+                order.pk = ids[order.order_number]
+
+        for order, order_items in zip(orders, items):
+            for item in order_items:
+                item.order = order
+        OrderItem.objects.bulk_create([item for order_items in items for item in order_items])
+
+        # bulk_create skips the OrderItem signals and per-row counters
+        recommendation_service.record_order_lines(quantities)
+        trending_service.record_events(quantities, ProductEvent.KIND_ORDER)
+        transaction.on_commit(lambda: recommendation_service.schedule_refresh(customer.pk))
+
+    logger.info('Placed %s orders (%s lines) for user %s', len(orders), len(quantities), customer.pk)
+    return orders
@@ -0,0 +1,98 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Process-local circuit breaker over a sliding window of recent calls.
+
+    The circuit opens once at least `min_calls` are recorded and either the
+    failure rate reaches `failure_rate` or the p95 latency reaches
+    `p95_latency` seconds. While open, allow_request() returns False; after
+    `reset_timeout` seconds a single probe call is let through (half-open).
+    A successful, fast probe closes the circuit, anything else re-opens it.
+    """
+
+    def __init__(self, name, *, window=20, min_calls=5, failure_rate=0.5,
+                 p95_latency=4.0, reset_timeout=30.0):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.p95_latency = p95_latency
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)
+        self._state = STATE_CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow_request(self):
+        """Whether the caller may hit the protected service now."""
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return True
+
+            if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+                logger.info('Circuit %s half-open, probing', self.name)
+
+            if self._state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self, latency):
+        self._record(True, latency)
+
+    def record_failure(self, latency):
+        self._record(False, latency)
+
+    def _p95(self):
+        latencies = sorted(latency for _ok, latency in self._calls)
+        return latencies[max(0, math.ceil(len(latencies) * 0.95) - 1)]
+
+    def _open(self, reason):
+        self._state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        logger.warning('Circuit %s opened: %s', self.name, reason)
+
+    def _record(self, ok, latency):
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                if ok and latency < self.p95_latency:
+                    self._state = STATE_CLOSED
+                    self._calls.clear()
+                    self._probe_in_flight = False
+                    logger.info('Circuit %s closed', self.name)
+                else:
+                    self._open('probe failed' if not ok else f'probe took {latency:.2f}s')
+                return
+
+            self._calls.append((ok, latency))
+            if self._state != STATE_CLOSED or len(self._calls) < self.min_calls:
+                return
+
+            failures = sum(1 for call_ok, _latency in self._calls if not call_ok)
+            rate = failures / len(self._calls)
+            p95 = self._p95()
+            if rate >= self.failure_rate:
+                self._open(f'failure rate {rate:.0%}')
+            elif p95 >= self.p95_latency:
+                self._open(f'p95 latency {p95:.2f}s')
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+
+logger = logging.getLogger(__name__)
+
+# Price ranges offered by the product list filter, as (value, label, min, max)
+PRICE_BUCKETS = [
+    ('0-50000', 'Under PKR 50,000', 0, 50000),
+    ('50000-100000', 'PKR 50k - 100k', 50000, 100000),
+    ('100000-200000', 'PKR 100k - 200k', 100000, 200000),
+    ('200000-plus', 'Above PKR 200k', 200000, None),
+]
+
+GENERATION_KEY = 'facets:generation'
+
+
+def parse_price_range(value):
+    """
+    Parse a `price_range` query value ('50000-100000' or '200000-plus') into
+    (min_price, max_price); max_price is None for open ranges.
+    Returns None for empty or malformed values.
+    """
+    if not value or '-' not in value:
+        return None
+
+    try:
+        if 'plus' in value:
+            return int(value.split('-')[0]), None
+        min_price, max_price = map(int, value.split('-'))
+    except ValueError:
+        return None
+    return min_price, max_price
+
+
+def price_filter(bounds):
+    """Q object matching the same rows as the product list price filter."""
+    min_price, max_price = bounds
+    if max_price is None:
+        return Q(price__gte=min_price)
+    return Q(price__gte=min_price, price__lte=max_price)
+
+
+def invalidate():
+    """Drop every cached facet result (called when products change)."""
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def _cache_key(query, price_range):
+    generation = cache.get_or_set(GENERATION_KEY, time.time_ns(), None)
+    normalized = json.dumps({
+        'q': ' '.join((query or '').lower().split()),
+        'price_range': price_range or '',
+    }, sort_keys=True)
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    return f'facets:{generation}:{digest}'
+
+
+def _aggregate(queryset, bounds):
+    """One GROUP BY category pass with a conditional count per price bucket."""
+    bucket_counts = {
+        f'bucket_{i}': Count('id', filter=price_filter((low, high)))
+        for i, (_value, _label, low, high) in enumerate(PRICE_BUCKETS)
+    }
+    if bounds:
+        bucket_counts['in_range'] = Count('id', filter=price_filter(bounds))
+
+    rows = (
+        queryset.order_by()
+        .values('category_id', 'category__slug')
+        .annotate(total=Count('id'), **bucket_counts)
+    )
+    return [dict(row) for row in rows]
+
+
+def get_facets(queryset, *, query=None, selected_categories=None, price_range=None):
+    """
+    Return facet counts for the product list:
+        {
+            'total': <products matching every filter>,
+            'categories': {category_id: count},
+            'price_buckets': [{'value', 'label', 'count'}, ...],
+        }
+
+    `queryset` must already be narrowed by the search query but not by the
+    category or price filters; those are applied to the per-category rows so
+    each facet counts "what you would get if you picked this option".
+    The rows only depend on the query and price range, so that is the cache key.
+    """
+    bounds = parse_price_range(price_range)
+    key = _cache_key(query, price_range if bounds else None)
+
+    rows = cache.get(key)
+    if rows is None:
+        rows = _aggregate(queryset, bounds)
+        cache.set(key, rows, int(getattr(settings, 'FACET_CACHE_TIMEOUT', 300)))
+
+    selected = set(selected_categories or [])
+    count_field = 'in_range' if bounds else 'total'
+
+    categories = {}
+    bucket_totals = [0] * len(PRICE_BUCKETS)
+    total = 0
+    for row in rows:
+        categories[row['category_id']] = row[count_field]
+
+        if selected and row['category__slug'] not in selected:
+            continue
+
+        total += row[count_field]
+        for i in range(len(PRICE_BUCKETS)):
+            bucket_totals[i] += row[f'bucket_{i}']
+
+    price_buckets = [
+        {'value': value, 'label': label, 'count': bucket_totals[i]}
+        for i, (value, label, _low, _high) in enumerate(PRICE_BUCKETS)
+    ]
+
+    return {
+        'total': total,
+        'categories': categories,
+        'price_buckets': price_buckets,
+    }
@@ -0,0 +1,132 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_TIMEOUT = (3.05, 15)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    pool_size = int(getattr(settings, 'LLM_HTTP_POOL_SIZE', 10))
+    # Retries are handled in post_json so they can back off and log
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Return the process-wide keep-alive session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def set_session(session):
+    """Replace the shared session (e.g. with one pointed at a stub server in tests)."""
+    global _session
+    with _session_lock:
+        previous, _session = _session, session
+    if previous is not None and previous is not session:
+        previous.close()
+
+
+def reset():
+    """Close the shared session; the next request opens a fresh pool."""
+    set_session(None)
+
+
+def get_timeout(endpoint):
+    """(connect, read) timeout for a named endpoint from settings.LLM_HTTP_TIMEOUTS."""
+    timeouts = getattr(settings, 'LLM_HTTP_TIMEOUTS', {})
+    return tuple(timeouts.get(endpoint, DEFAULT_TIMEOUT))
+
+
+def _retry_delay(attempt, response=None):
+    # Never sleep longer than this, whatever the server asks for
+    max_delay = float(getattr(settings, 'LLM_HTTP_MAX_RETRY_DELAY', 10.0))
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), max_delay)
+
+    backoff = float(getattr(settings, 'LLM_HTTP_BACKOFF', 0.5))
+    # Exponential backoff with jitter so concurrent workers don't retry in step
+    return min(backoff * (2 ** attempt) * random.uniform(0.5, 1.0), max_delay)
+
+
+def _remaining(deadline):
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def post_json(url, payload, *, headers=None, endpoint='default', deadline=None):
+    """
+    POST a JSON payload through the shared session and return the decoded
+    JSON response.
+
+    Connection errors, timeouts and 429/5xx responses are retried up to
+    settings.LLM_HTTP_RETRIES times with exponential backoff (Retry-After is
+    honoured up to settings.LLM_HTTP_MAX_RETRY_DELAY seconds). `deadline`
+    (a time.monotonic() value) caps the whole call: socket timeouts are
+    shortened to the time left and no retry starts that could not finish
+    before it. Raises requests.RequestException once retries are exhausted
+    (HTTPError for error statuses, Timeout when the deadline passes) and
+    ValueError when the body is not valid JSON.
+    """
+    retries = int(getattr(settings, 'LLM_HTTP_RETRIES', 2))
+    connect_timeout, read_timeout = get_timeout(endpoint)
+
+    attempt = 0
+    while True:
+        remaining = _remaining(deadline)
+        if remaining is not None and remaining <= 0:
+            raise Timeout(f'{endpoint} request exceeded its latency budget')
+
+        timeout = (connect_timeout, read_timeout)
+        if remaining is not None:
+            timeout = (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+        response = None
+        try:
+            response = get_session().post(url, json=payload, headers=headers, timeout=timeout)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                response.raise_for_status()
+                return response.json()
+            reason = f'HTTP {response.status_code}'
+        except (ConnectionError, Timeout) as e:
+            if attempt >= retries:
+                raise
+            reason = str(e)
+
+        delay = _retry_delay(attempt, response)
+        remaining = _remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            if response is not None:
+                response.raise_for_status()
+            raise Timeout(f'{endpoint} request exceeded its latency budget ({reason})')
+
+        attempt += 1
+        logger.warning(
+            '%s request failed (%s); retry %s/%s in %.2fs',
+            endpoint, reason, attempt, retries, delay,
+        )
+        time.sleep(delay)
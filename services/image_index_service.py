@@ -0,0 +1,272 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when extract_features changes so stored vectors get recomputed
+FEATURE_VERSION = 1
+
+_HIST_BINS = 4          # per RGB channel -> 64 colour bins
+_GRID_SIZE = 16         # downscaled grayscale thumbnail -> 256 values
+_EDGE_BINS = 8          # gradient orientation bins per cell
+_EDGE_CELLS = 2         # 2x2 spatial cells -> 32 edge values
+_WORK_SIZE = 64         # side of the square working image
+
+FEATURE_DIM = _HIST_BINS ** 3 + _GRID_SIZE ** 2 + _EDGE_BINS * _EDGE_CELLS ** 2
+
+# Relative weight of each descriptor block in the final vector
+_BLOCK_WEIGHTS = (0.5, 0.3, 0.2)
+
+DIRTY_KEY = 'visual_index:dirty_at'
+BUILT_KEY = 'visual_index:built_at'
+REBUILD_LOCK_KEY = 'visual_index:rebuilding'
+
+_VECTORS_FILE = 'vectors.npy'
+_IDS_FILE = 'ids.npy'
+
+
+def _unit(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def extract_features(image):
+    """
+    Compute a compact, L2-normalised descriptor for an image:
+    a colour histogram, a downscaled grayscale layout and a coarse
+    edge-orientation histogram, concatenated as float32.
+    """
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    work = image.resize((_WORK_SIZE, _WORK_SIZE), Image.BILINEAR)
+    rgb = np.asarray(work, dtype=np.float32)
+
+    # Colour histogram (Hellinger-normalised so dominant colours don't swamp it)
+    quantized = (rgb // (256 // _HIST_BINS)).astype(np.int32)
+    codes = (quantized[..., 0] * _HIST_BINS + quantized[..., 1]) * _HIST_BINS + quantized[..., 2]
+    hist = np.bincount(codes.ravel(), minlength=_HIST_BINS ** 3).astype(np.float32)
+    hist = _unit(np.sqrt(hist / hist.sum()))
+
+    # Grayscale layout, mean-centred so overall brightness doesn't dominate
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    layout = np.asarray(
+        Image.fromarray(gray.astype(np.uint8)).resize((_GRID_SIZE, _GRID_SIZE), Image.BILINEAR),
+        dtype=np.float32,
+    ).ravel()
+    layout = _unit(layout - layout.mean())
+
+    # Edge orientation histogram per spatial cell, weighted by gradient magnitude
+    gy, gx = np.gradient(gray)
+    magnitude = np.hypot(gx, gy)
+    orientation = (np.arctan2(gy, gx) % np.pi) / np.pi * _EDGE_BINS
+    orientation = np.minimum(orientation.astype(np.int32), _EDGE_BINS - 1)
+    cell = _WORK_SIZE // _EDGE_CELLS
+    edges = []
+    for row in range(_EDGE_CELLS):
+        for col in range(_EDGE_CELLS):
+            window = np.s_[row * cell:(row + 1) * cell, col * cell:(col + 1) * cell]
+            edges.append(np.bincount(
+                orientation[window].ravel(),
+                weights=magnitude[window].ravel(),
+                minlength=_EDGE_BINS,
+            ))
+    edges = _unit(np.concatenate(edges).astype(np.float32))
+
+    hist_w, layout_w, edge_w = _BLOCK_WEIGHTS
+    vector = np.concatenate([hist * hist_w, layout * layout_w, edges * edge_w])
+    return _unit(vector).astype(np.float32)
+
+
+def _open_product_image(product):
+    image_file = product.main_image
+    image_file.open('rb')
+    try:
+        image = Image.open(image_file)
+        image.draft('RGB', (_WORK_SIZE * 4, _WORK_SIZE * 4))
+        image.load()
+        return image
+    finally:
+        image_file.close()
+
+
+def mark_dirty():
+    """Flag the on-disk matrix as stale; it is rebuilt on the next query."""
+    cache.set(DIRTY_KEY, time.time(), None)
+
+
+def index_product_image(product, force=False):
+    """
+    Compute and store the embedding for a product's main image.
+    Skips the work when the stored vector already matches the current image.
+    Returns True when a vector was (re)computed.
+    """
+    from products.models import ProductImageEmbedding
+
+    if not product.main_image:
+        deleted, _ = ProductImageEmbedding.objects.filter(product=product).delete()
+        if deleted:
+            mark_dirty()
+        return False
+
+    image_name = product.main_image.name
+    if not force:
+        current = ProductImageEmbedding.objects.filter(
+            product=product,
+            image_name=image_name,
+            feature_version=FEATURE_VERSION,
+        ).exists()
+        if current:
+            return False
+
+    try:
+        vector = extract_features(_open_product_image(product))
+    except (OSError, ValueError) as e:
+        logger.warning('Could not compute image features for product %s: %s', product.pk, e)
+        return False
+
+    ProductImageEmbedding.objects.update_or_create(
+        product=product,
+        defaults={
+            'image_name': image_name,
+            'feature_version': FEATURE_VERSION,
+            'vector': vector.tobytes(),
+        },
+    )
+    mark_dirty()
+    return True
+
+
+def _index_dir():
+    return Path(getattr(settings, 'VISUAL_INDEX_DIR', Path(settings.BASE_DIR) / 'var' / 'visual_index'))
+
+
+def rebuild_matrix():
+    """
+    Write every stored embedding into a (N x FEATURE_DIM) float32 .npy matrix
+    plus a matching product id array. Rows are streamed from the database
+    straight into the memory-mapped file, so memory use stays flat.
+    Returns the number of rows written.
+    """
+    from products.models import ProductImageEmbedding
+
+    index_dir = _index_dir()
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    started_at = time.time()
+    embeddings = ProductImageEmbedding.objects.filter(feature_version=FEATURE_VERSION)
+    total = embeddings.count()
+
+    vectors_tmp = index_dir / f'{_VECTORS_FILE}.{os.getpid()}.tmp'
+    ids = np.zeros(total, dtype=np.int64)
+    vectors = np.lib.format.open_memmap(vectors_tmp, mode='w+', dtype=np.float32, shape=(total, FEATURE_DIM))
+
+    row = 0
+    for product_id, blob in embeddings.order_by('product_id').values_list('product_id', 'vector').iterator():
+        if row >= total:
+            break
+        vector = np.frombuffer(bytes(blob), dtype=np.float32)
+        if vector.shape[0] != FEATURE_DIM:
+            continue
+        vectors[row] = vector
+        ids[row] = product_id
+        row += 1
+
+    vectors.flush()
+    del vectors
+
+    ids_tmp = index_dir / f'{_IDS_FILE}.{os.getpid()}.tmp'
+    with open(ids_tmp, 'wb') as fh:
+        np.save(fh, ids[:row])
+    os.replace(vectors_tmp, index_dir / _VECTORS_FILE)
+    os.replace(ids_tmp, index_dir / _IDS_FILE)
+
+    cache.set(BUILT_KEY, started_at, None)
+    logger.info('Visual index rebuilt: %s vectors in %.2fs', row, time.time() - started_at)
+    return row
+
+
+class _MatrixHandle:
+    """Process-local memory map of the on-disk matrix, reopened when the files change."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.vectors = None
+        self.ids = None
+        self.mtime = None
+
+    def load(self):
+        index_dir = _index_dir()
+        vectors_path = index_dir / _VECTORS_FILE
+        ids_path = index_dir / _IDS_FILE
+        try:
+            mtime = max(vectors_path.stat().st_mtime, ids_path.stat().st_mtime)
+        except FileNotFoundError:
+            return None, None
+
+        if mtime != self.mtime:
+            ids = np.load(ids_path)
+            vectors = np.load(vectors_path, mmap_mode='r')
+            # Rows past len(ids) were skipped during the rebuild
+            self.vectors = vectors[:len(ids)]
+            self.ids = ids
+            self.mtime = mtime
+        return self.vectors, self.ids
+
+
+_matrix = _MatrixHandle()
+
+
+def _ensure_fresh():
+    dirty_at = cache.get(DIRTY_KEY)
+    built_at = cache.get(BUILT_KEY)
+
+    if (_index_dir() / _IDS_FILE).exists():
+        if dirty_at is None or (built_at is not None and built_at >= dirty_at):
+            return
+
+        # Coalesce bursts of product edits into one rebuild per interval
+        interval = int(getattr(settings, 'VISUAL_INDEX_REBUILD_INTERVAL', 60))
+        if built_at is not None and time.time() - built_at < interval:
+            return
+
+    if cache.add(REBUILD_LOCK_KEY, True, 300):
+        try:
+            rebuild_matrix()
+        finally:
+            cache.delete(REBUILD_LOCK_KEY)
+
+
+def find_visually_similar(image, top_k=6, candidates=None):
+    """
+    Return [(product_id, similarity), ...] for the stored images closest to
+    `image` by cosine similarity, best first. `candidates` widens the
+    number of rows returned (e.g. for a re-ranking step).
+    """
+    _ensure_fresh()
+
+    with _matrix.lock:
+        vectors, ids = _matrix.load()
+    if vectors is None or not len(ids):
+        return []
+
+    query = extract_features(image)
+    scores = np.asarray(vectors @ query)
+
+    k = min(len(ids), candidates or top_k)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+
+    min_similarity = float(getattr(settings, 'VISUAL_SEARCH_MIN_SIMILARITY', 0.5))
+    return [
+        (int(ids[i]), float(scores[i]))
+        for i in top
+        if scores[i] >= min_similarity
+    ]
@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'product_lists:generation'
+
+# Product fields that can move a product in or out of the cached lists
+LIST_FIELDS = {'is_available', 'rating', 'is_featured', 'ai_recommended', 'is_trending'}
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def invalidate():
+    """Drop every cached product id list (this process at once, others within PRODUCT_LIST_LOCAL_TTL)."""
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+    with _local_lock:
+        _local.clear()
+
+
+def _pack(ids):
+    return array('q', ids).tobytes()
+
+
+def _unpack(blob):
+    ids = array('q')
+    ids.frombytes(blob)
+    return ids
+
+
+def _store(key, compute):
+    ids = array('q', compute())
+    timeout = int(getattr(settings, 'PRODUCT_LIST_STALE_TTL', 3600))
+    cache.set(key, (time.time(), _pack(ids)), timeout)
+    return ids
+
+
+def _revalidate(key, lock_key, compute):
+    close_old_connections()
+    try:
+        _store(key, compute)
+    except Exception as e:
+        logger.exception('Refreshing cached product list %s failed: %s', key, e)
+    finally:
+        cache.delete(lock_key)
+        connection.close()
+
+
+def get_ids(name, compute):
+    """
+    Return the cached product id list `name` as a compact array, computing it
+    with `compute()` (an iterable of ids) on a miss.
+
+    Lists live in the shared Django cache and in a process-local copy that
+    is trusted for PRODUCT_LIST_LOCAL_TTL seconds. Once a shared entry is
+    older than PRODUCT_LIST_FRESH_TTL it is still served while one
+    background thread recomputes it (stale-while-revalidate).
+    """
+    now = time.time()
+    with _local_lock:
+        local = _local.get(name)
+    if local is not None and now < local[0]:
+        return local[1]
+
+    generation = cache.get_or_set(GENERATION_KEY, time.time_ns(), None)
+    key = f'product_lists:{generation}:{name}'
+
+    entry = cache.get(key)
+    if entry is None:
+        ids = _store(key, compute)
+    else:
+        computed_at, blob = entry
+        ids = _unpack(blob)
+        if now - computed_at > int(getattr(settings, 'PRODUCT_LIST_FRESH_TTL', 300)):
+            lock_key = f'{key}:refreshing'
+            if cache.add(lock_key, True, 60):
+                threading.Thread(target=_revalidate, args=(key, lock_key, compute), daemon=True).start()
+
+    local_ttl = int(getattr(settings, 'PRODUCT_LIST_LOCAL_TTL', 10))
+    with _local_lock:
+        _local[name] = (now + local_ttl, ids)
+    return ids
+
+
+def get_products(name, compute, limit):
+    """The first `limit` products of a cached id list, in list order."""
+    from products.models import Product
+
+    ids = list(get_ids(name, compute)[:limit])
+    products = Product.objects.select_related('category').in_bulk(ids)
+    return [products[pid] for pid in ids if pid in products]
@@ -1,13 +1,42 @@
 import logging
+import threading
+import time
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
-import requests
 from requests.exceptions import RequestException
 from decouple import config
+from django.conf import settings
+
+from services import http_client
+from services.circuit_breaker import CircuitBreaker
+from services.ttl_cache import TTLLRUCache
 
 
 logger = logging.getLogger(__name__)
 
+_breaker = None
+_breaker_lock = threading.Lock()
+
+_decision_cache = None
+_decision_cache_lock = threading.Lock()
+
+
+def get_breaker():
+    """Circuit breaker guarding the negotiation LLM endpoint (one per process)."""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    'negotiation',
+                    window=int(getattr(settings, 'NEGOTIATION_BREAKER_WINDOW', 20)),
+                    min_calls=int(getattr(settings, 'NEGOTIATION_BREAKER_MIN_CALLS', 5)),
+                    failure_rate=float(getattr(settings, 'NEGOTIATION_BREAKER_FAILURE_RATE', 0.5)),
+                    p95_latency=float(getattr(settings, 'NEGOTIATION_BREAKER_P95_LATENCY', 4.0)),
+                    reset_timeout=float(getattr(settings, 'NEGOTIATION_BREAKER_RESET_TIMEOUT', 30)),
+                )
+    return _breaker
+
 
 def _build_prompt(*, product_price: Decimal, min_price: Decimal, offer: Decimal) -> str:
     product_price = Decimal(str(product_price)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -66,6 +95,72 @@ def _parse_response(*, raw_text: str, min_price: Decimal, product_price: Decimal
     return {'decision': 'counter', 'counter_price': fallback}
 
 
+def _is_well_formed(raw_text: str) -> bool:
+    """Whether the model answered in one of the three expected formats."""
+    text = (raw_text or '').strip()
+    if text in ('ACCEPT', 'REJECT'):
+        return True
+    if text.startswith('COUNTER:'):
+        try:
+            Decimal(text[len('COUNTER:'):].strip())
+        except (InvalidOperation, TypeError):
+            return False
+        return True
+    return False
+
+
+def get_decision_cache():
+    """In-process cache of LLM decisions keyed by bucketed price ratios."""
+    global _decision_cache
+    if _decision_cache is None:
+        with _decision_cache_lock:
+            if _decision_cache is None:
+                _decision_cache = TTLLRUCache(
+                    maxsize=int(getattr(settings, 'NEGOTIATION_CACHE_MAX_ENTRIES', 2048)),
+                    ttl=float(getattr(settings, 'NEGOTIATION_CACHE_TTL', 3600)),
+                )
+    return _decision_cache
+
+
+def _ratio_key(*, product_price: Decimal, min_price: Decimal, offer: Decimal):
+    """
+    Bucket (offer / listed, minimum / listed) so offers that ask the same
+    question at different price points share one cached decision.
+    """
+    if product_price <= 0:
+        return None
+    step = Decimal(str(getattr(settings, 'NEGOTIATION_CACHE_BUCKET', '0.01')))
+    return (
+        int((offer / product_price / step).to_integral_value(rounding=ROUND_HALF_UP)),
+        int((min_price / product_price / step).to_integral_value(rounding=ROUND_HALF_UP)),
+    )
+
+
+def _cached_decision(key, *, product_price: Decimal, min_price: Decimal, offer: Decimal):
+    entry = get_decision_cache().get(key)
+    if entry is None:
+        return None
+
+    decision, counter_ratio = entry
+    if decision == 'counter':
+        raw_text = f'COUNTER: {counter_ratio * product_price}'
+    else:
+        raw_text = decision.upper()
+
+    # Rescaled counters still go through the usual min/listed clamping
+    parsed = _parse_response(raw_text=raw_text, min_price=min_price, product_price=product_price, offer=offer)
+    parsed['raw_output'] = raw_text
+    parsed['cached'] = True
+    return parsed
+
+
+def _remember_decision(key, parsed, *, product_price: Decimal):
+    counter_ratio = None
+    if parsed['decision'] == 'counter':
+        counter_ratio = parsed['counter_price'] / product_price
+    get_decision_cache().set(key, (parsed['decision'], counter_ratio))
+
+
 def negotiate_price(*, product_price: Decimal, min_price: Decimal, offer: Decimal):
     endpoint = config('LLAMA_ENDPOINT', default='')
     api_key = config('LLAMA_API_KEY', default='')
@@ -98,10 +193,29 @@ def negotiate_price(*, product_price: Decimal, min_price: Decimal, offer: Decima
         'Content-Type': 'application/json',
     }
 
+    cache_key = _ratio_key(product_price=product_price, min_price=min_price, offer=offer)
+    if cache_key is not None:
+        cached = _cached_decision(cache_key, product_price=product_price, min_price=min_price, offer=offer)
+        if cached is not None:
+            logger.info('LLAMA negotiation cache hit: %s', cached['raw_output'])
+            return cached
+
+    breaker = get_breaker()
+    if not breaker.allow_request():
+        logger.warning('Negotiation circuit %s. Using fallback.', breaker.state)
+        parsed = _parse_response(raw_text='', min_price=min_price, product_price=product_price, offer=offer)
+        parsed['raw_output'] = raw_output
+        return parsed
+
+    budget = float(getattr(settings, 'NEGOTIATION_LATENCY_BUDGET', 5.0))
+    started_at = time.monotonic()
+    succeeded = False
+
     try:
-        response = requests.post(endpoint, json=payload, headers=headers, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        data = http_client.post_json(
+            endpoint, payload, headers=headers,
+            endpoint='negotiation', deadline=started_at + budget,
+        )
 
         content = ''
         if isinstance(data, dict):
@@ -114,6 +228,7 @@ def negotiate_price(*, product_price: Decimal, min_price: Decimal, offer: Decima
 
         raw_output = (content or '').strip()
         logger.info('LLAMA negotiation raw output: %s', raw_output)
+        succeeded = True
 
     except RequestException as e:
         logger.exception('LLAMA negotiation request failed: %s', e)
@@ -125,6 +240,15 @@ def negotiate_price(*, product_price: Decimal, min_price: Decimal, offer: Decima
         logger.exception('LLAMA negotiation unexpected error: %s', e)
         raw_output = ''
 
+    latency = time.monotonic() - started_at
+    if succeeded:
+        breaker.record_success(latency)
+    else:
+        breaker.record_failure(latency)
+
     parsed = _parse_response(raw_text=raw_output, min_price=min_price, product_price=product_price, offer=offer)
+    if cache_key is not None and _is_well_formed(raw_output):
+        _remember_decision(cache_key, parsed, product_price=product_price)
+
     parsed['raw_output'] = raw_output
-    return parsed
\ No newline at end of file
+    return parsed
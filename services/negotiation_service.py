@@ -0,0 +1,256 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from services.negotiation_strategies import strategy_for_product
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_flight = set()
+
+
+def _money(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def max_attempts():
+    return int(getattr(settings, 'MAX_NEGOTIATION_ATTEMPTS', 3))
+
+
+def negotiation_prices(product):
+    """(listed_price, min_price) for negotiating on `product`."""
+    try:
+        min_price = product.price * (Decimal('1') - Decimal(str(settings.MAX_NEGOTIATION_DISCOUNT)))
+    except Exception:
+        min_price = product.price
+    return _money(product.price), _money(min_price)
+
+
+def normalize_decision(*, decision, counter_price, offer, listed_price, min_price):
+    """
+    Apply the store's hard limits to a strategy's answer: never accept below
+    the minimum price and keep counters within [min_price, listed_price].
+    Returns (decision, counter_price).
+    """
+    from products.models import ProductNegotiationOffer
+
+    if decision == ProductNegotiationOffer.DECISION_ACCEPT:
+        if offer < min_price:
+            return ProductNegotiationOffer.DECISION_COUNTER, min_price
+        return decision, None
+
+    if decision == ProductNegotiationOffer.DECISION_REJECT:
+        return decision, None
+
+    if decision == ProductNegotiationOffer.DECISION_COUNTER:
+        try:
+            counter_price = _money(counter_price)
+        except (InvalidOperation, TypeError):
+            counter_price = _money((offer + listed_price) / 2)
+    else:
+        decision = ProductNegotiationOffer.DECISION_COUNTER
+        counter_price = _money((offer + listed_price) / 2)
+
+    if counter_price < min_price:
+        counter_price = min_price
+    if counter_price > listed_price:
+        counter_price = listed_price
+    return decision, counter_price
+
+
+class _NegotiationClosed(Exception):
+    pass
+
+
+def record_offer(negotiation, *, offer_price, decision, counter_price=None, raw_ai_output=''):
+    """
+    Insert an offer and advance the negotiation's attempt_count and
+    latest_offer in the same transaction.
+
+    The counter is bumped with a conditional UPDATE (still open, attempts
+    left, no offer awaiting a decision), so concurrent submissions cannot
+    exceed MAX_NEGOTIATION_ATTEMPTS or queue a second pending offer.
+    Returns the new offer, or None when the negotiation no longer takes offers.
+    """
+    from products.models import ProductNegotiation, ProductNegotiationOffer
+
+    try:
+        with transaction.atomic():
+            offer = ProductNegotiationOffer.objects.create(
+                negotiation=negotiation,
+                offer_price=offer_price,
+                decision=decision,
+                counter_price=counter_price,
+                raw_ai_output=raw_ai_output,
+            )
+            claimed = ProductNegotiation.objects.filter(
+                pk=negotiation.pk,
+                status=ProductNegotiation.STATUS_OPEN,
+                attempt_count__lt=max_attempts(),
+            ).filter(
+                Q(latest_offer__isnull=True)
+                | ~Q(latest_offer__decision=ProductNegotiationOffer.DECISION_PENDING)
+            ).update(
+                attempt_count=F('attempt_count') + 1,
+                latest_offer=offer,
+                updated_at=timezone.now(),
+            )
+            if not claimed:
+                raise _NegotiationClosed
+    except _NegotiationClosed:
+        return None
+
+    negotiation.refresh_from_db(fields=['attempt_count', 'updated_at'])
+    negotiation.latest_offer = offer
+    return offer
+
+
+def apply_decision(negotiation, decision, offer):
+    """
+    Update the negotiation after a decided offer. On accept, returns the
+    buyer's pending NegotiatedOrder at the offered price (created if needed).
+    """
+    from customers.models import NegotiatedOrder
+    from products.models import ProductNegotiation, ProductNegotiationOffer
+
+    if decision == ProductNegotiationOffer.DECISION_ACCEPT:
+        negotiation.status = ProductNegotiation.STATUS_ACCEPTED
+        negotiation.save(update_fields=['status', 'updated_at'])
+
+        pending = NegotiatedOrder.objects.filter(
+            buyer_id=negotiation.buyer_id,
+            product_id=negotiation.product_id,
+            status=NegotiatedOrder.STATUS_PENDING,
+        ).order_by('-created_at').first()
+
+        if pending and pending.expires_at and pending.expires_at <= timezone.now():
+            pending.status = NegotiatedOrder.STATUS_CANCELLED
+            pending.save(update_fields=['status'])
+            pending = None
+
+        if pending and pending.negotiated_price != offer:
+            pending.status = NegotiatedOrder.STATUS_CANCELLED
+            pending.save(update_fields=['status'])
+            pending = None
+
+        if not pending:
+            pending = NegotiatedOrder.objects.create(
+                buyer_id=negotiation.buyer_id,
+                product_id=negotiation.product_id,
+                negotiated_price=offer,
+                status=NegotiatedOrder.STATUS_PENDING,
+            )
+        return pending
+
+    if decision == ProductNegotiationOffer.DECISION_REJECT:
+        # Only permanently close the negotiation if all attempts are exhausted
+        if negotiation.attempt_count >= max_attempts():
+            negotiation.status = ProductNegotiation.STATUS_REJECTED
+            negotiation.save(update_fields=['status', 'updated_at'])
+            return None
+
+    negotiation.save(update_fields=['updated_at'])
+    return None
+
+
+def resolve_pending_offer(offer_id):
+    """
+    Run the product's negotiation strategy for a pending offer and record
+    the outcome. Safe to call more than once: only the first call to finish
+    moves the offer out of the pending state.
+    """
+    from products.models import ProductNegotiationOffer
+
+    offer = (
+        ProductNegotiationOffer.objects
+        .select_related(
+            'negotiation__product__category',
+            'negotiation__product__seller__seller_profile',
+        )
+        .filter(pk=offer_id, decision=ProductNegotiationOffer.DECISION_PENDING)
+        .first()
+    )
+    if offer is None:
+        return
+
+    negotiation = offer.negotiation
+    product = negotiation.product
+    listed_price, min_price = negotiation_prices(product)
+    # Later offers are blocked while this one is pending, so it is the latest attempt
+    attempt = negotiation.attempt_count
+
+    result = strategy_for_product(product).decide(
+        listed_price=listed_price,
+        min_price=min_price,
+        offer=offer.offer_price,
+        attempt=attempt,
+        max_attempts=max_attempts(),
+        started_at=negotiation.created_at,
+    )
+    decision, counter_price = normalize_decision(
+        decision=result.get('decision'),
+        counter_price=result.get('counter_price'),
+        offer=offer.offer_price,
+        listed_price=listed_price,
+        min_price=min_price,
+    )
+
+    with transaction.atomic():
+        updated = ProductNegotiationOffer.objects.filter(
+            pk=offer.pk,
+            decision=ProductNegotiationOffer.DECISION_PENDING,
+        ).update(
+            decision=decision,
+            counter_price=counter_price,
+            raw_ai_output=result.get('raw_output') or '',
+        )
+        if updated:
+            apply_decision(negotiation, decision, offer.offer_price)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(getattr(settings, 'NEGOTIATION_WORKERS', 4)),
+                    thread_name_prefix='negotiation',
+                )
+    return _executor
+
+
+def _run(offer_id):
+    close_old_connections()
+    try:
+        resolve_pending_offer(offer_id)
+    except Exception as e:
+        logger.exception('Resolving negotiation offer %s failed: %s', offer_id, e)
+    finally:
+        with _executor_lock:
+            _in_flight.discard(offer_id)
+        connection.close()
+
+
+def submit_offer(offer_id):
+    """
+    Resolve a pending offer on the background worker pool once the current
+    transaction commits. Offers already queued in this process are skipped.
+    """
+    def enqueue():
+        with _executor_lock:
+            if offer_id in _in_flight:
+                return
+            _in_flight.add(offer_id)
+        _get_executor().submit(_run, offer_id)
+
+    transaction.on_commit(enqueue)
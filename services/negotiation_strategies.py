@@ -0,0 +1,135 @@
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.utils import timezone
+
+from services.llama_service import negotiate_price
+
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_LLM = 'llm'
+STRATEGY_CONCESSION = 'concession'
+STRATEGY_TIME_DECAY = 'time_decay'
+
+
+def _money(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+class NegotiationStrategy:
+    """
+    Decides the middle band of an offer (between the minimum price and the
+    listed price); the hard accept/reject rules stay in negotiate_view.
+
+    decide() returns {'decision', 'counter_price', 'raw_output'} with
+    decision one of 'accept', 'reject' or 'counter'. Strategies marked
+    `remote` call out to another service and are run off the request path.
+    """
+    name = None
+    remote = False
+
+    def decide(self, *, listed_price, min_price, offer, attempt, max_attempts, started_at=None):
+        raise NotImplementedError
+
+
+class LLMStrategy(NegotiationStrategy):
+    """Ask the negotiation LLM (with its cache, breaker and fallback)."""
+    name = STRATEGY_LLM
+    remote = True
+
+    def decide(self, *, listed_price, min_price, offer, attempt, max_attempts, started_at=None):
+        return negotiate_price(product_price=listed_price, min_price=min_price, offer=offer)
+
+
+class ConcessionCurveStrategy(NegotiationStrategy):
+    """
+    Deterministic concession curve. The seller's asking price slides from
+    the listed price down to the minimum as negotiation progresses:
+
+        ask(t) = listed - (listed - min) * (k + (1 - k) * t ** (1 / beta))
+
+    with t in [0, 1]. beta < 1 holds out until late ("boulware"), beta > 1
+    concedes early; k is the share of the discount given up front. Offers
+    at or above the current ask are accepted, anything lower is countered
+    at the ask.
+    """
+
+    def __init__(self, *, beta=None, initial=None):
+        self.beta = float(beta if beta is not None else getattr(settings, 'NEGOTIATION_CONCESSION_BETA', 1.0))
+        self.initial = float(initial if initial is not None else getattr(settings, 'NEGOTIATION_CONCESSION_INITIAL', 0.0))
+
+    def progress(self, *, attempt, max_attempts, started_at):
+        raise NotImplementedError
+
+    def asking_price(self, *, listed_price, min_price, progress):
+        progress = min(max(progress, 0.0), 1.0)
+        conceded = self.initial + (1 - self.initial) * progress ** (1 / self.beta)
+        ask = listed_price - (listed_price - min_price) * Decimal(str(round(conceded, 6)))
+        return min(max(_money(ask), min_price), listed_price)
+
+    def decide(self, *, listed_price, min_price, offer, attempt, max_attempts, started_at=None):
+        progress = self.progress(attempt=attempt, max_attempts=max_attempts, started_at=started_at)
+        ask = self.asking_price(listed_price=listed_price, min_price=min_price, progress=progress)
+
+        if offer >= ask:
+            return {'decision': 'accept', 'counter_price': None, 'raw_output': f'{self.name}: ACCEPT'}
+        return {'decision': 'counter', 'counter_price': ask, 'raw_output': f'{self.name}: COUNTER: {ask}'}
+
+
+class AttemptConcessionStrategy(ConcessionCurveStrategy):
+    """Concede by attempt number: the last allowed attempt reaches the minimum price."""
+    name = STRATEGY_CONCESSION
+
+    def progress(self, *, attempt, max_attempts, started_at):
+        return attempt / max_attempts if max_attempts > 0 else 1.0
+
+
+class TimeDecayConcessionStrategy(ConcessionCurveStrategy):
+    """Concede with the age of the negotiation, reaching the minimum after NEGOTIATION_CONCESSION_HORIZON seconds."""
+    name = STRATEGY_TIME_DECAY
+
+    def progress(self, *, attempt, max_attempts, started_at):
+        if started_at is None:
+            return 0.0
+        horizon = float(getattr(settings, 'NEGOTIATION_CONCESSION_HORIZON', 24 * 3600))
+        elapsed = (timezone.now() - started_at).total_seconds()
+        return elapsed / horizon if horizon > 0 else 1.0
+
+
+_registry = {}
+
+
+def register_strategy(strategy_class):
+    """Make a NegotiationStrategy subclass selectable by its `name`."""
+    _registry[strategy_class.name] = strategy_class
+    return strategy_class
+
+
+for _strategy_class in (LLMStrategy, AttemptConcessionStrategy, TimeDecayConcessionStrategy):
+    register_strategy(_strategy_class)
+
+
+def get_strategy(name=None):
+    """Instantiate the strategy called `name`, or the NEGOTIATION_STRATEGY default."""
+    default = getattr(settings, 'NEGOTIATION_STRATEGY', STRATEGY_LLM)
+    strategy_class = _registry.get(name or default)
+    if strategy_class is None:
+        logger.warning('Unknown negotiation strategy %r; using %r.', name, default)
+        strategy_class = _registry.get(default, LLMStrategy)
+    return strategy_class()
+
+
+def strategy_for_product(product):
+    """
+    Strategy for negotiating on `product`: the seller's choice first, then the
+    category's, then settings.NEGOTIATION_STRATEGY.
+    """
+    name = ''
+    profile = getattr(product.seller, 'seller_profile', None) if product.seller_id else None
+    if profile is not None:
+        name = profile.negotiation_strategy
+    if not name and product.category_id:
+        name = product.category.negotiation_strategy
+    return get_strategy(name)
@@ -0,0 +1,64 @@
+import secrets
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+
+# Crockford base32: no I, L, O or U, so numbers read back unambiguously
+_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+_RANDOM_BITS = 80
+_RANDOM_LIMIT = 1 << _RANDOM_BITS
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def _next_ids(count):
+    """
+    `count` consecutive (millisecond, random) pairs in ULID order. Within one
+    millisecond (or if the clock steps back) the random part is incremented
+    instead of redrawn, so ids from this process never go backwards.
+    """
+    global _last_ms, _last_random
+
+    ids = []
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms, _last_random = now_ms, secrets.randbits(_RANDOM_BITS)
+        else:
+            _last_random += 1
+
+        for _ in range(count):
+            if _last_random >= _RANDOM_LIMIT:
+                _last_ms, _last_random = _last_ms + 1, secrets.randbits(_RANDOM_BITS)
+            ids.append((_last_ms, _last_random))
+            _last_random += 1
+        _last_random -= 1
+    return ids
+
+
+def generate(count=1):
+    """
+    `count` new order numbers, ascending: ORD-YYYYMMDD-<26-char ULID>.
+
+    The ULID is a 48-bit millisecond timestamp plus 80 random bits, so
+    numbers are unique without a database round trip and sort by creation
+    time, which keeps inserts at the right-hand edge of the order_number
+    index. The date is the UTC day of the timestamp.
+    """
+    numbers = []
+    for ms, random_part in _next_ids(count):
+        day = datetime.fromtimestamp(ms / 1000, tz=dt_timezone.utc).strftime('%Y%m%d')
+        numbers.append(f'ORD-{day}-{_encode(ms, 10)}{_encode(random_part, 16)}')
+    return numbers
@@ -1,21 +1,37 @@
-from django.db.models import Count, Q
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, Count, F, PositiveIntegerField, Q, Value, When, Window
+from django.db.models.functions import RowNumber
 from products.models import Product, Category
+from services import list_cache_service
 
 
-def get_recommendations_for_user(user, limit=6):
+logger = logging.getLogger(__name__)
+
+_refresh_queue = set()
+_refresh_lock = threading.Lock()
+_refresh_timer = None
+
+
+def _compute_recommendation_ids(user_id, size):
     """
-    Returns recommended products for a logged-in user based on:
+    Returns recommended product ids for a user based on:
     1. Categories from their order history (weighted higher)
     2. Categories from their wishlist
     Excludes products they already purchased.
     Falls back to top-rated products if no history exists.
     """
-    from customers.models import OrderItem, Order, Wishlist
+    from customers.models import OrderItem, Wishlist
 
     # Step 1: Get category IDs from order history
     ordered_category_ids = list(
         OrderItem.objects.filter(
-            order__customer=user,
+            order__customer_id=user_id,
             product__isnull=False
         )
         .values('product__category')
@@ -26,7 +42,7 @@ def get_recommendations_for_user(user, limit=6):
 
     # Step 2: Get category IDs from wishlist
     wishlist_category_ids = list(
-        Wishlist.objects.filter(customer=user)
+        Wishlist.objects.filter(customer_id=user_id)
         .values_list('product__category', flat=True)
         .distinct()
     )
@@ -34,7 +50,7 @@ def get_recommendations_for_user(user, limit=6):
     # Step 3: Get IDs of already purchased products to exclude
     purchased_product_ids = list(
         OrderItem.objects.filter(
-            order__customer=user,
+            order__customer_id=user_id,
             product__isnull=False
         ).values_list('product_id', flat=True).distinct()
     )
@@ -47,63 +63,225 @@ def get_recommendations_for_user(user, limit=6):
             seen.add(cid)
             combined_category_ids.append(cid)
 
-    # Step 5: If user has history, recommend from those categories
+    # Step 5: If user has history, recommend from those categories.
+    # Only the best `size` products of each category can make the cut, so a
+    # ROW_NUMBER() window per category bounds the rows fetched to
+    # size x categories no matter how large the categories are.
     if combined_category_ids:
-        # Preserve category priority order using Python sorting
         products = list(
             Product.objects.filter(
                 is_available=True,
                 category__in=combined_category_ids
             )
             .exclude(id__in=purchased_product_ids)
-            .select_related('category')
-            .order_by('-rating', '-created_at')
+            .annotate(category_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('category_id')],
+                order_by=[F('rating').desc(), F('created_at').desc(), F('id').desc()],
+            ))
+            .filter(category_rank__lte=size)
+            .values_list('id', 'category_id', 'category_rank')
         )
 
-        # Sort by category priority (most ordered category first)
+        # Sort by category priority (most ordered category first), best rated first within it
         category_priority = {cid: idx for idx, cid in enumerate(combined_category_ids)}
-        products.sort(key=lambda p: category_priority.get(p.category_id, 999))
+        products.sort(key=lambda row: (category_priority.get(row[1], 999), row[2]))
 
         if products:
-            return products[:limit]
+            return [product_id for product_id, _category_id, _rank in products[:size]]
 
     # Step 6: Fallback — top rated + featured products
     return list(
         Product.objects.filter(is_available=True)
-        .order_by('-rating', '-is_featured', '-created_at')[:limit]
+        .order_by('-rating', '-is_featured', '-created_at')
+        .values_list('id', flat=True)[:size]
+    )
+
+
+def refresh_user_recommendations(user_id):
+    """
+    Recompute and store the top RECOMMENDATION_STORE_SIZE products for a user.
+    Returns the stored product ids.
+    """
+    from customers.models import UserRecommendation
+
+    size = int(getattr(settings, 'RECOMMENDATION_STORE_SIZE', 12))
+    product_ids = _compute_recommendation_ids(user_id, size)
+
+    with transaction.atomic():
+        UserRecommendation.objects.filter(user_id=user_id).delete()
+        UserRecommendation.objects.bulk_create([
+            UserRecommendation(user_id=user_id, product_id=product_id, rank=rank)
+            for rank, product_id in enumerate(product_ids)
+        ])
+    return product_ids
+
+
+def _flush_refresh_queue():
+    global _refresh_timer
+    with _refresh_lock:
+        user_ids = list(_refresh_queue)
+        _refresh_queue.clear()
+        _refresh_timer = None
+
+    close_old_connections()
+    try:
+        for user_id in user_ids:
+            try:
+                refresh_user_recommendations(user_id)
+            except Exception as e:
+                logger.exception('Recommendation refresh failed for user %s: %s', user_id, e)
+    finally:
+        connection.close()
+
+
+def schedule_refresh(user_id):
+    """
+    Queue a recommendation refresh for a user. Changes arriving within
+    RECOMMENDATION_REFRESH_DELAY seconds (e.g. every item of a checkout)
+    are coalesced into one background refresh.
+    """
+    global _refresh_timer
+    with _refresh_lock:
+        _refresh_queue.add(user_id)
+        if _refresh_timer is None:
+            delay = float(getattr(settings, 'RECOMMENDATION_REFRESH_DELAY', 5))
+            _refresh_timer = threading.Timer(delay, _flush_refresh_queue)
+            _refresh_timer.daemon = True
+            _refresh_timer.start()
+
+
+def get_recommendations_for_user(user, limit=6):
+    """
+    Returns the stored recommendations for a logged-in user with one indexed
+    query. When nothing usable is stored, a background refresh is queued and
+    the shared guest list is served meanwhile.
+    """
+    products = list(
+        Product.objects.filter(user_recommendations__user=user, is_available=True)
+        .select_related('category')
+        .order_by('user_recommendations__rank')[:limit]
+    )
+    if products:
+        return products
+
+    # Not computed yet (or everything stored went unavailable)
+    schedule_refresh(user.pk)
+    return get_recommendations_for_guest(limit)
+
+
+def _guest_recommendation_ids():
+    size = int(getattr(settings, 'PRODUCT_LIST_SIZE', 12))
+    return (
+        Product.objects.filter(is_available=True)
+        .order_by('-is_featured', '-rating', '-created_at')
+        .values_list('id', flat=True)[:size]
+    )
+
+
+def _ai_recommended_ids():
+    size = int(getattr(settings, 'PRODUCT_LIST_SIZE', 12))
+    return (
+        Product.objects.filter(is_available=True, ai_recommended=True)
+        .order_by('-created_at')
+        .values_list('id', flat=True)[:size]
     )
 
 
 def get_recommendations_for_guest(limit=6):
     """
     Returns featured or top-rated products for non-logged-in visitors.
+    The ranking is shared by every visitor, so only the id list is cached.
     """
-    return list(
-        Product.objects.filter(is_available=True)
-        .order_by('-is_featured', '-rating', '-created_at')[:limit]
+    return list_cache_service.get_products('guest', _guest_recommendation_ids, limit)
+
+
+def get_ai_recommended_products(limit=6):
+    """
+    Newest products carrying the ai_recommended flag (cached id list).
+    """
+    return list_cache_service.get_products('ai_recommended', _ai_recommended_ids, limit)
+
+
+def record_order_lines(product_ids):
+    """
+    Add newly placed order lines to Product.order_count, one per entry in
+    `product_ids` (repeats count once each), in a single UPDATE.
+    """
+    counts = Counter(pid for pid in product_ids if pid is not None)
+    if not counts:
+        return
+    Product.objects.filter(id__in=counts).update(
+        order_count=F('order_count') + Case(
+            *(When(id=pid, then=Value(n)) for pid, n in counts.items()),
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        )
     )
 
 
-def refresh_ai_recommended_flag(limit=12):
+def recount_order_lines():
     """
-    Updates the ai_recommended boolean flag on Product model.
-    Top `limit` most-ordered products get flagged as True.
-    All others get False.
-    Call this periodically (e.g. from a management command or admin action).
+    Rebuild Product.order_count from OrderItem, writing only the products
+    whose stored count drifted. Returns the number of rows written.
     """
     from customers.models import OrderItem
 
-    top_product_ids = list(
+    actual = dict(
         OrderItem.objects.filter(product__isnull=False)
         .values('product_id')
-        .annotate(total_orders=Count('id'))
-        .order_by('-total_orders')
-        .values_list('product_id', flat=True)[:limit]
+        .annotate(total=Count('id'))
+        .values_list('product_id', 'total')
     )
+    stale = [
+        Product(id=pid, order_count=actual.get(pid, 0))
+        for pid, stored in Product.objects.values_list('id', 'order_count').iterator()
+        if stored != actual.get(pid, 0)
+    ]
+    Product.objects.bulk_update(stale, ['order_count'], batch_size=500)
+    return len(stale)
 
-    # Clear all first
-    Product.objects.update(ai_recommended=False)
 
-    # Set top products
-    if top_product_ids:
-        Product.objects.filter(id__in=top_product_ids).update(ai_recommended=True)
+def refresh_ai_recommended_flag(limit=12, full=False):
+    """
+    Flag the `limit` most-ordered products as ai_recommended.
+
+    Ranks by the running Product.order_count and only writes the rows whose
+    membership changed; `full=True` first recounts order_count from OrderItem.
+    Call this periodically (see the refresh_ai_recommended command).
+    Returns {'recounted', 'added', 'removed', 'rows_written', 'elapsed'}.
+    """
+    started = time.monotonic()
+    recounted = recount_order_lines() if full else 0
+
+    top_ids = set(
+        Product.objects.filter(order_count__gt=0)
+        .order_by('-order_count', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    current_ids = set(Product.objects.filter(ai_recommended=True).values_list('id', flat=True))
+
+    added = top_ids - current_ids
+    removed = current_ids - top_ids
+    with transaction.atomic():
+        if removed:
+            Product.objects.filter(id__in=removed).update(ai_recommended=False)
+        if added:
+            Product.objects.filter(id__in=added).update(ai_recommended=True)
+
+    if added or removed:
+        # Queryset updates bypass the post_save signal
+        list_cache_service.invalidate()
+
+    stats = {
+        'recounted': recounted,
+        'added': len(added),
+        'removed': len(removed),
+        'rows_written': recounted + len(added) + len(removed),
+        'elapsed': time.monotonic() - started,
+    }
+    logger.info(
+        'ai_recommended refreshed: +%s -%s, %s rows written in %.3fs',
+        stats['added'], stats['removed'], stats['rows_written'], stats['elapsed'],
+    )
+    return stats
@@ -0,0 +1,232 @@
+import logging
+import re
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+
+logger = logging.getLogger(__name__)
+
+SQLITE_FTS_TABLE = 'products_product_fts'
+POSTGRES_SEARCH_TABLE = 'products_product_search'
+
+# Fields that feed the index. Saves that only touch other fields (stock, sku,
+# flags) do not need a re-index.
+INDEXED_FIELDS = {'name', 'description', 'brand', 'category', 'category_id'}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+KEYWORD_MIN_LENGTH = 3
+KEYWORD_MAX_LENGTH = 64
+
+# BM25 column weights for (name, description, brand, category)
+_SQLITE_BM25_WEIGHTS = '10.0, 1.0, 5.0, 5.0'
+
+_POSTGRES_DOCUMENT_SQL = (
+    "setweight(to_tsvector('simple', %s), 'A') || "
+    "setweight(to_tsvector('simple', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'C')"
+)
+
+_backend_cache = {}
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return [token.lower() for token in _TOKEN_RE.findall(text or '')]
+
+
+def fold_term(token):
+    """Normalise a keyword token for the postings table (light plural folding)."""
+    token = token.lower()
+    if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+        token = token[:-1]
+    return token[:KEYWORD_MAX_LENGTH]
+
+
+def keyword_terms(text):
+    """Distinct folded terms of 3+ characters in `text`."""
+    return {fold_term(token) for token in tokenize(text) if len(token) >= KEYWORD_MIN_LENGTH}
+
+
+def get_backend():
+    """
+    Return 'sqlite' or 'postgresql' when the full-text index exists on the
+    current database, otherwise None (callers fall back to LIKE scans).
+    """
+    alias = connection.alias
+    if alias not in _backend_cache:
+        backend = None
+        try:
+            tables = set(connection.introspection.table_names())
+        except DatabaseError:
+            tables = set()
+
+        if connection.vendor == 'sqlite' and SQLITE_FTS_TABLE in tables:
+            backend = 'sqlite'
+        elif connection.vendor == 'postgresql' and POSTGRES_SEARCH_TABLE in tables:
+            backend = 'postgresql'
+
+        _backend_cache[alias] = backend
+    return _backend_cache[alias]
+
+
+def _document_fields(product):
+    category_name = product.category.name if product.category_id else ''
+    return {
+        'name': product.name or '',
+        'description': product.description or '',
+        'brand': product.brand or '',
+        'category': category_name or '',
+    }
+
+
+def index_product(product):
+    """Insert or replace the index entry for a single product."""
+    backend = get_backend()
+    if backend is None:
+        return
+
+    doc = _document_fields(product)
+    try:
+        with connection.cursor() as cursor:
+            if backend == 'sqlite':
+                cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', [product.pk])
+                cursor.execute(
+                    f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, name, description, brand, category) '
+                    'VALUES (%s, %s, %s, %s, %s)',
+                    [product.pk, doc['name'], doc['description'], doc['brand'], doc['category']],
+                )
+            else:
+                cursor.execute(
+                    f'INSERT INTO {POSTGRES_SEARCH_TABLE} (product_id, document) '
+                    f'VALUES (%s, {_POSTGRES_DOCUMENT_SQL}) '
+                    'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                    [product.pk, doc['name'], doc['brand'], doc['category'], doc['description']],
+                )
+    except DatabaseError as e:
+        logger.exception('Search index update failed for product %s: %s', product.pk, e)
+
+
+def remove_product(product_id):
+    """Drop a product from the index."""
+    backend = get_backend()
+    if backend is None:
+        return
+
+    table = SQLITE_FTS_TABLE if backend == 'sqlite' else POSTGRES_SEARCH_TABLE
+    column = 'rowid' if backend == 'sqlite' else 'product_id'
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE {column} = %s', [product_id])
+    except DatabaseError as e:
+        logger.exception('Search index delete failed for product %s: %s', product_id, e)
+
+
+def update_keywords(product):
+    """Sync the ProductKeyword postings of a single product."""
+    from products.models import ProductKeyword
+
+    terms = keyword_terms(' '.join(_document_fields(product).values()))
+    existing = set(
+        ProductKeyword.objects.filter(product=product).values_list('token', flat=True)
+    )
+
+    stale = existing - terms
+    if stale:
+        ProductKeyword.objects.filter(product=product, token__in=stale).delete()
+
+    new = terms - existing
+    if new:
+        ProductKeyword.objects.bulk_create(
+            [ProductKeyword(product=product, token=token) for token in new],
+            ignore_conflicts=True,
+        )
+
+
+def rebuild_index():
+    """
+    Rebuild the keyword postings and (when available) the full-text index
+    from the Product table. Returns the number of products processed.
+    """
+    from products.models import Product
+
+    backend = get_backend()
+    if backend is not None:
+        table = SQLITE_FTS_TABLE if backend == 'sqlite' else POSTGRES_SEARCH_TABLE
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table}')
+
+    count = 0
+    for product in Product.objects.select_related('category').iterator():
+        index_product(product)
+        update_keywords(product)
+        count += 1
+    return count
+
+
+def _ranked_ids(tokens, limit):
+    """Return product ids matching every token, best match first."""
+    backend = get_backend()
+
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            match = ' '.join(f'"{token}"*' for token in tokens)
+            cursor.execute(
+                f'SELECT rowid FROM {SQLITE_FTS_TABLE} '
+                f'WHERE {SQLITE_FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({SQLITE_FTS_TABLE}, {_SQLITE_BM25_WEIGHTS}) '
+                'LIMIT %s',
+                [match, limit],
+            )
+        else:
+            tsquery = ' & '.join(f'{token}:*' for token in tokens)
+            cursor.execute(
+                f'SELECT product_id FROM {POSTGRES_SEARCH_TABLE} '
+                "WHERE document @@ to_tsquery('simple', %s) "
+                "ORDER BY ts_rank_cd(document, to_tsquery('simple', %s)) DESC "
+                'LIMIT %s',
+                [tsquery, tsquery, limit],
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(queryset, query):
+    return queryset.filter(
+        Q(name__icontains=query) |
+        Q(description__icontains=query) |
+        Q(brand__icontains=query) |
+        Q(category__name__icontains=query)
+    ).annotate(search_rank=Value(0, output_field=IntegerField()))
+
+
+def search_products(queryset, query):
+    """
+    Filter a Product queryset down to the products matching `query`.
+
+    Uses the full-text index when it is available and annotates each row with
+    `search_rank` (0 = best match); the result is ordered by that rank.
+    Falls back to case-insensitive LIKE matching otherwise.
+    """
+    tokens = tokenize(query)
+    if not tokens or get_backend() is None:
+        return _fallback_search(queryset, query)
+
+    limit = int(getattr(settings, 'SEARCH_MAX_RESULTS', 500))
+    try:
+        ranked_ids = _ranked_ids(tokens, limit)
+    except DatabaseError as e:
+        logger.exception('Full-text search failed, using fallback: %s', e)
+        return _fallback_search(queryset, query)
+
+    if not ranked_ids:
+        # Keep the annotation so callers can still order by search_rank
+        return queryset.none().annotate(search_rank=Value(0, output_field=IntegerField()))
+
+    rank = Case(
+        *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ranked_ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=ranked_ids).annotate(search_rank=rank).order_by('search_rank')
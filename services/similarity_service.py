@@ -0,0 +1,168 @@
+import logging
+import time
+from array import array
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+_FETCH_SIZE = 20000
+
+
+def _interactions():
+    """
+    Stream (user_id, product_id, weight) arrays from order lines and
+    wishlists without materialising model instances.
+    """
+    from customers.models import OrderItem, Wishlist
+
+    wishlist_weight = float(getattr(settings, 'SIMILARITY_WISHLIST_WEIGHT', 0.5))
+
+    users = array('q')
+    products = array('q')
+    weights = array('f')
+
+    order_lines = (
+        OrderItem.objects.filter(product__isnull=False)
+        .values_list('order__customer_id', 'product_id')
+        .iterator(chunk_size=_FETCH_SIZE)
+    )
+    for user_id, product_id in order_lines:
+        users.append(user_id)
+        products.append(product_id)
+        weights.append(1.0)
+
+    wishlisted = Wishlist.objects.values_list('customer_id', 'product_id').iterator(chunk_size=_FETCH_SIZE)
+    for user_id, product_id in wishlisted:
+        users.append(user_id)
+        products.append(product_id)
+        weights.append(wishlist_weight)
+
+    return (
+        np.frombuffer(users, dtype=np.int64),
+        np.frombuffer(products, dtype=np.int64),
+        np.frombuffer(weights, dtype=np.float32),
+    )
+
+
+def _item_matrix(user_ids, product_ids, weights):
+    """
+    Row-normalised sparse product x user matrix. Repeat purchases are
+    damped with log1p so one bulk buyer does not dominate a product.
+    Returns (matrix, product id for each row).
+    """
+    from scipy import sparse
+
+    product_index, product_rows = np.unique(product_ids, return_inverse=True)
+    _user_index, user_cols = np.unique(user_ids, return_inverse=True)
+
+    matrix = sparse.csr_matrix(
+        (weights, (product_rows, user_cols)),
+        shape=(len(product_index), len(_user_index)),
+        dtype=np.float32,
+    )
+    matrix.sum_duplicates()
+    matrix.data = np.log1p(matrix.data)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    matrix = sparse.diags(1.0 / norms).dot(matrix).tocsr()
+    return matrix, product_index
+
+
+def _top_k(similarity, row_offset, top_k, min_score):
+    """Yield (row, [(col, score), ...]) for each row of a sparse similarity block."""
+    for i in range(similarity.shape[0]):
+        start, end = similarity.indptr[i], similarity.indptr[i + 1]
+        cols = similarity.indices[start:end]
+        scores = similarity.data[start:end]
+
+        keep = (cols != row_offset + i) & (scores >= min_score)
+        cols, scores = cols[keep], scores[keep]
+        if len(cols) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            cols, scores = cols[best], scores[best]
+
+        order = np.argsort(-scores, kind='stable')
+        yield i, [(int(cols[j]), float(scores[j])) for j in order]
+
+
+def build_item_similarities(top_k=None, chunk_size=None):
+    """
+    Rebuild ProductSimilarity from order lines and wishlists: cosine
+    similarity between products' customer vectors, top_k neighbours each.
+
+    The product x product similarity is computed `chunk_size` rows at a time
+    (one sparse matrix product per chunk) and written before the next chunk,
+    so peak memory is bounded by the interaction matrix plus one chunk.
+    Returns (products written, similarity rows written).
+    """
+    from products.models import ProductSimilarity
+
+    top_k = int(top_k or getattr(settings, 'SIMILARITY_TOP_K', 20))
+    chunk_size = int(chunk_size or getattr(settings, 'SIMILARITY_CHUNK_SIZE', 2000))
+    min_score = float(getattr(settings, 'SIMILARITY_MIN_SCORE', 0.01))
+
+    started = time.monotonic()
+    build_started_at = timezone.now()
+
+    user_ids, product_ids, weights = _interactions()
+    loaded = time.monotonic()
+    if not len(product_ids):
+        ProductSimilarity.objects.all().delete()
+        return 0, 0
+
+    matrix, product_index = _item_matrix(user_ids, product_ids, weights)
+    transposed = matrix.T.tocsc()
+
+    products_written = 0
+    rows_written = 0
+    for offset in range(0, matrix.shape[0], chunk_size):
+        block = matrix[offset:offset + chunk_size].dot(transposed).tocsr()
+
+        batch = []
+        chunk_products = []
+        for i, neighbours in _top_k(block, offset, top_k, min_score):
+            product_id = int(product_index[offset + i])
+            chunk_products.append(product_id)
+            batch.extend(
+                ProductSimilarity(
+                    product_id=product_id,
+                    similar_product_id=int(product_index[col]),
+                    score=score,
+                    rank=rank,
+                    created_at=build_started_at,
+                )
+                for rank, (col, score) in enumerate(neighbours)
+            )
+
+        with transaction.atomic():
+            ProductSimilarity.objects.filter(product_id__in=chunk_products).delete()
+            ProductSimilarity.objects.bulk_create(batch, batch_size=1000)
+
+        products_written += len(chunk_products)
+        rows_written += len(batch)
+
+    # Products that lost all their interactions still have rows from an older build
+    ProductSimilarity.objects.filter(created_at__lt=build_started_at).delete()
+
+    logger.info(
+        'Item similarities rebuilt: %s interactions, %s products, %s rows (load %.2fs, total %.2fs)',
+        len(product_ids), products_written, rows_written, loaded - started, time.monotonic() - started,
+    )
+    return products_written, rows_written
+
+
+def get_also_bought(product, limit=4):
+    """Available products most often bought or wishlisted by the same customers."""
+    from products.models import Product
+
+    return list(
+        Product.objects.filter(similar_from__product=product, is_available=True)
+        .select_related('category')
+        .order_by('similar_from__rank')[:limit]
+    )
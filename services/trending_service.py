@@ -0,0 +1,173 @@
+import logging
+import math
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from services import list_cache_service
+
+
+logger = logging.getLogger(__name__)
+
+COMPACT_LOCK_KEY = 'trending:compacting'
+
+_FETCH_SIZE = 20000
+
+DEFAULT_EVENT_WEIGHTS = {
+    'order': 5.0,
+    'wishlist': 3.0,
+    'cart_add': 2.0,
+    'view': 0.2,
+}
+
+
+def record_event(product_id, kind):
+    """Log one popularity event (a single INSERT; scoring happens at compaction)."""
+    from products.models import ProductEvent
+
+    ProductEvent.objects.create(product_id=product_id, kind=kind)
+
+
+def record_events(product_ids, kind):
+    """Log one event of `kind` per entry in `product_ids` with a single INSERT."""
+    from products.models import ProductEvent
+
+    events = [ProductEvent(product_id=pid, kind=kind) for pid in product_ids if pid is not None]
+    if events:
+        ProductEvent.objects.bulk_create(events)
+
+
+def _decay_rate():
+    half_life = float(getattr(settings, 'TRENDING_HALF_LIFE', 24 * 3600))
+    return math.log(2) / half_life if half_life > 0 else 0.0
+
+
+def _decayed(score, scored_at, now, rate):
+    age = max((now - scored_at).total_seconds(), 0.0)
+    return score * math.exp(-rate * age)
+
+
+def compact_events():
+    """
+    Fold the event log into ProductTrend and refresh Product.is_trending.
+
+    Each event adds weight * exp(-rate * age) to its product's score, where
+    the weight comes from TRENDING_EVENT_WEIGHTS and rate from
+    TRENDING_HALF_LIFE. Only products with new events have their trend row
+    rewritten; scores that decayed below TRENDING_MIN_SCORE are dropped.
+    The compacted events are deleted, and is_trending is flipped only where
+    membership of the top TRENDING_SIZE available products changed.
+
+    Returns {'events', 'scored', 'faded', 'added', 'removed',
+    'rows_written', 'elapsed'}, or None if another compaction is running.
+    """
+    from products.models import Product, ProductEvent, ProductTrend
+
+    if not cache.add(COMPACT_LOCK_KEY, True, 600):
+        logger.info('Trending compaction already running; skipped.')
+        return None
+
+    try:
+        started = time.monotonic()
+        now = timezone.now()
+        rate = _decay_rate()
+        weights = getattr(settings, 'TRENDING_EVENT_WEIGHTS', DEFAULT_EVENT_WEIGHTS)
+        min_score = float(getattr(settings, 'TRENDING_MIN_SCORE', 0.05))
+        size = int(getattr(settings, 'TRENDING_SIZE', 12))
+
+        with transaction.atomic():
+            # Events logged while compacting get the next run
+            max_id = ProductEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+            gains = defaultdict(float)
+            event_count = 0
+            events = (
+                ProductEvent.objects.filter(id__lte=max_id)
+                .values_list('product_id', 'kind', 'created_at')
+                .iterator(chunk_size=_FETCH_SIZE)
+            )
+            for product_id, kind, created_at in events:
+                gains[product_id] += _decayed(weights.get(kind, 0.0), created_at, now, rate)
+                event_count += 1
+
+            stored = set()
+            scores = {}
+            for product_id, score, scored_at in ProductTrend.objects.values_list('product_id', 'score', 'scored_at'):
+                stored.add(product_id)
+                scores[product_id] = _decayed(score, scored_at, now, rate)
+            for product_id, gain in gains.items():
+                scores[product_id] = scores.get(product_id, 0.0) + gain
+
+            faded = {pid for pid, score in scores.items() if score < min_score}
+            scored = [pid for pid in gains if pid not in faded]
+
+            ProductTrend.objects.filter(product_id__in=faded & stored).delete()
+            ProductTrend.objects.bulk_create(
+                [ProductTrend(product_id=pid, score=scores[pid], scored_at=now) for pid in scored if pid not in stored],
+                batch_size=500,
+            )
+            ProductTrend.objects.bulk_update(
+                [ProductTrend(product_id=pid, score=scores[pid], scored_at=now) for pid in scored if pid in stored],
+                ['score', 'scored_at'],
+                batch_size=500,
+            )
+            ProductEvent.objects.filter(id__lte=max_id).delete()
+
+            ranked = sorted((pid for pid in scores if pid not in faded), key=lambda pid: -scores[pid])
+            available = set(
+                Product.objects.filter(id__in=ranked, is_available=True).values_list('id', flat=True)
+            )
+            top_ids = set([pid for pid in ranked if pid in available][:size])
+            current_ids = set(Product.objects.filter(is_trending=True).values_list('id', flat=True))
+
+            added = top_ids - current_ids
+            removed = current_ids - top_ids
+            if removed:
+                Product.objects.filter(id__in=removed).update(is_trending=False)
+            if added:
+                Product.objects.filter(id__in=added).update(is_trending=True)
+
+        if added or removed or top_ids & gains.keys():
+            # Membership or order of the cached Trending list changed
+            list_cache_service.invalidate()
+
+        stats = {
+            'events': event_count,
+            'scored': len(scored),
+            'faded': len(faded & stored),
+            'added': len(added),
+            'removed': len(removed),
+            'rows_written': len(scored) + len(faded & stored) + len(added) + len(removed),
+            'elapsed': time.monotonic() - started,
+        }
+        logger.info(
+            'Trending compacted %s events: %s scores written, %s faded, is_trending +%s -%s (%.3fs)',
+            stats['events'], stats['scored'], stats['faded'], stats['added'], stats['removed'], stats['elapsed'],
+        )
+        return stats
+    finally:
+        cache.delete(COMPACT_LOCK_KEY)
+
+
+def _trending_ids():
+    from products.models import ProductTrend
+
+    size = int(getattr(settings, 'PRODUCT_LIST_SIZE', 12))
+    now = timezone.now()
+    rate = _decay_rate()
+    rows = ProductTrend.objects.filter(
+        product__is_available=True,
+        product__is_trending=True,
+    ).values_list('product_id', 'score', 'scored_at')
+    ranked = sorted(rows, key=lambda row: -_decayed(row[1], row[2], now, rate))
+    return [row[0] for row in ranked[:size]]
+
+
+def get_trending_products(limit=6):
+    """Products flagged is_trending, hottest first (cached id list)."""
+    return list_cache_service.get_products('trending', _trending_ids, limit)
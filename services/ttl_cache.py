@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class TTLLRUCache:
+    """
+    Thread-safe in-process cache with per-entry expiry and LRU eviction.
+    Entries older than `ttl` seconds are treated as missing; once more than
+    `maxsize` entries are stored, the least recently used one is dropped.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -1,23 +1,126 @@
 import io
 import base64
 import logging
-import requests
-from PIL import Image
+import time
+from collections import defaultdict
+from datetime import timedelta
+from PIL import Image, ImageOps
 from decouple import config
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F, Q
+from django.utils import timezone
+from requests.exceptions import RequestException
+
+from services import http_client, search_service
+from services.image_index_service import find_visually_similar
 
 logger = logging.getLogger(__name__)
 
 GROQ_API_KEY = config('LLAMA_API_KEY', default='')
-GROQ_ENDPOINT = 'https://api.groq.com/openai/v1/chat/completions'
+GROQ_ENDPOINT = config('GROQ_VISION_ENDPOINT', default='https://api.groq.com/openai/v1/chat/completions')
+
+# Perceptual hash layout: 64 bits split into 4 indexed 16-bit bands. Two
+# hashes within Hamming distance < 4 always share at least one band.
+HASH_BANDS = 4
+HASH_BAND_BITS = 16
+
+
+def load_upload_image(fileobj) -> Image.Image:
+    """
+    Open an uploaded image at a bounded working size (VISION_UPLOAD_MAX_SIDE).
+    JPEGs are decoded at a reduced scale via Image.draft so multi-megapixel
+    phone photos never decode at full resolution. EXIF orientation is
+    applied and all metadata is dropped.
+    """
+    max_side = int(getattr(settings, 'VISION_UPLOAD_MAX_SIDE', 1024))
+
+    started = time.perf_counter()
+    image = Image.open(fileobj)
+    original_size = image.size
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    decoded = time.perf_counter()
+
+    image = image.convert('RGB')
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image.info = {}
+    resized = time.perf_counter()
+
+    logger.info(
+        'Upload image %sx%s -> %sx%s (decode %.1fms, resize %.1fms)',
+        *original_size, *image.size,
+        (decoded - started) * 1000, (resized - decoded) * 1000,
+    )
+    return image
+
+
+def _jpeg_bytes(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _encode_for_vision(image: Image.Image) -> bytes:
+    """
+    JPEG-encode an image for the vision model: shrink to VISION_IMAGE_MAX_SIDE
+    and pick the highest quality that fits VISION_IMAGE_MAX_BYTES, scaling
+    the image down further if even the lowest quality is too large.
+    """
+    max_side = int(getattr(settings, 'VISION_IMAGE_MAX_SIDE', 512))
+    budget = int(getattr(settings, 'VISION_IMAGE_MAX_BYTES', 100_000))
+    min_quality = int(getattr(settings, 'VISION_JPEG_MIN_QUALITY', 40))
+    max_quality = int(getattr(settings, 'VISION_JPEG_MAX_QUALITY', 85))
+
+    started = time.perf_counter()
+    work = image.convert('RGB')
+    work.thumbnail((max_side, max_side), Image.LANCZOS)
+    resized = time.perf_counter()
+
+    encodes = 0
+    while True:
+        data = _jpeg_bytes(work, max_quality)
+        encodes += 1
+        quality = max_quality
+        if len(data) > budget:
+            # Binary search for the highest quality that fits the budget
+            best = None
+            low, high = min_quality, max_quality - 1
+            while low <= high:
+                mid = (low + high) // 2
+                candidate = _jpeg_bytes(work, mid)
+                encodes += 1
+                if len(candidate) <= budget:
+                    best, quality = candidate, mid
+                    low = mid + 1
+                else:
+                    high = mid - 1
+            if best is not None:
+                data = best
+            elif min(work.size) > 64:
+                work = work.resize((work.width * 3 // 4, work.height * 3 // 4), Image.LANCZOS)
+                continue
+            else:
+                data, quality = _jpeg_bytes(work, min_quality), min_quality
+        break
+
+    encoded = time.perf_counter()
+    logger.info(
+        'Vision upload %sx%s, %s bytes at quality %s (resize %.1fms, encode %.1fms over %s passes)',
+        *work.size, len(data), quality,
+        (resized - started) * 1000, (encoded - resized) * 1000, encodes,
+    )
+    return data
 
 
 def _describe_image(image: Image.Image) -> str:
     """
     Send image to Groq vision model and get a product search description back.
+    The call, retries included, is bounded by VISUAL_SEARCH_LATENCY_BUDGET.
     """
-    buffer = io.BytesIO()
-    image.save(buffer, format='JPEG')
-    b64_image = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    budget = float(getattr(settings, 'VISUAL_SEARCH_LATENCY_BUDGET', 20.0))
+    deadline = time.monotonic() + budget
+    b64_image = base64.b64encode(_encode_for_vision(image)).decode('utf-8')
 
     prompt = (
         "Look at this product image and describe it in a short search query of 5-10 words. "
@@ -55,102 +158,244 @@ def _describe_image(image: Image.Image) -> str:
         'Content-Type': 'application/json',
     }
 
-    response = requests.post(GROQ_ENDPOINT, json=payload, headers=headers, timeout=20)
-    response.raise_for_status()
+    data = http_client.post_json(
+        GROQ_ENDPOINT, payload, headers=headers,
+        endpoint='vision', deadline=deadline,
+    )
 
-    description = response.json()['choices'][0]['message']['content'].strip().lower()
+    description = data['choices'][0]['message']['content'].strip().lower()
     logger.info('Groq vision description: %s', description)
     return description
 
 
-def find_similar_products(uploaded_image: Image.Image, top_k: int = 6):
-    from products.models import Product
+def _image_hash(image: Image.Image) -> int:
+    """64-bit difference hash (dHash): robust to re-encoding and resizing."""
+    gray = image.convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | int(left > right)
+    return value
 
-    # Broad stop words — generic terms that match everything and mean nothing
-    STOP_WORDS = {
-        'the', 'and', 'for', 'with', 'this', 'that', 'from',
-        'are', 'was', 'has', 'have', 'its', 'into', 'onto',
-        'very', 'also', 'some', 'such', 'than', 'then',
-        # Generic product words that cause false positives
-        'product', 'item', 'good', 'nice', 'quality', 'design',
-        'style', 'color', 'image', 'photo', 'picture', 'looking',
-        'high', 'new', 'best', 'top', 'great', 'big', 'small',
-    }
 
-    description = _describe_image(uploaded_image)
-    logger.info('Groq description: %s', description)
+def _hash_bands(image_hash: int):
+    mask = (1 << HASH_BAND_BITS) - 1
+    return [(image_hash >> (HASH_BAND_BITS * i)) & mask for i in range(HASH_BANDS)]
+
+
+def _cached_description(image_hash: int):
+    """Description of a cached image within the Hamming-distance threshold, or None."""
+    from products.models import ImageDescriptionCache
+
+    now = timezone.now()
+    ttl = timedelta(seconds=int(getattr(settings, 'VISION_CACHE_TTL', 7 * 24 * 3600)))
+    max_distance = min(int(getattr(settings, 'VISION_CACHE_MAX_DISTANCE', 3)), HASH_BANDS - 1)
+
+    band_match = Q()
+    for i, band in enumerate(_hash_bands(image_hash)):
+        band_match |= Q(**{f'band_{i}': band})
+
+    candidates = (
+        ImageDescriptionCache.objects
+        .filter(band_match, created_at__gte=now - ttl)
+        .values_list('id', 'image_hash', 'description')
+    )
+
+    best = None
+    for pk, hex_hash, description in candidates:
+        distance = bin(int(hex_hash, 16) ^ image_hash).count('1')
+        if distance <= max_distance and (best is None or distance < best[0]):
+            best = (distance, pk, description)
+
+    if best is None:
+        return None
+
+    ImageDescriptionCache.objects.filter(pk=best[1]).update(last_used_at=now, hits=F('hits') + 1)
+    return best[2]
+
+
+def _store_description(image_hash: int, description: str):
+    from products.models import ImageDescriptionCache
+
+    now = timezone.now()
+    bands = _hash_bands(image_hash)
+    ImageDescriptionCache.objects.update_or_create(
+        image_hash=f'{image_hash:016x}',
+        defaults={
+            **{f'band_{i}': band for i, band in enumerate(bands)},
+            'description': description,
+            'created_at': now,
+            'last_used_at': now,
+        },
+    )
+
+    # Expire by TTL, then evict least recently used entries beyond the cap
+    ttl = timedelta(seconds=int(getattr(settings, 'VISION_CACHE_TTL', 7 * 24 * 3600)))
+    ImageDescriptionCache.objects.filter(created_at__lt=now - ttl).delete()
+
+    max_entries = int(getattr(settings, 'VISION_CACHE_MAX_ENTRIES', 5000))
+    excess = ImageDescriptionCache.objects.count() - max_entries
+    if excess > 0:
+        oldest = list(
+            ImageDescriptionCache.objects.order_by('last_used_at')
+            .values_list('id', flat=True)[:excess]
+        )
+        ImageDescriptionCache.objects.filter(id__in=oldest).delete()
+
+
+def describe_image(image: Image.Image) -> str:
+    """
+    Describe an image with the vision model, reusing the cached description
+    of an identical or near-identical earlier upload when there is one.
+    """
+    image_hash = _image_hash(image)
+
+    try:
+        cached = _cached_description(image_hash)
+    except DatabaseError as e:
+        logger.exception('Vision description cache lookup failed: %s', e)
+        cached = None
+
+    if cached is not None:
+        logger.info('Vision description cache hit: %s', cached)
+        return cached
+
+    description = _describe_image(image)
 
-    # Clean and filter keywords
+    try:
+        _store_description(image_hash, description)
+    except DatabaseError as e:
+        logger.exception('Vision description cache write failed: %s', e)
+
+    return description
+
+
+# Broad stop words — generic terms that match everything and mean nothing
+STOP_WORDS = {
+    'the', 'and', 'for', 'with', 'this', 'that', 'from',
+    'are', 'was', 'has', 'have', 'its', 'into', 'onto',
+    'very', 'also', 'some', 'such', 'than', 'then',
+    # Generic product words that cause false positives
+    'product', 'item', 'good', 'nice', 'quality', 'design',
+    'style', 'color', 'image', 'photo', 'picture', 'looking',
+    'high', 'new', 'best', 'top', 'great', 'big', 'small',
+}
+
+
+def _extract_keywords(description: str):
     raw_words = description.replace(',', ' ').replace('-', ' ').split()
-    keywords = [
+    return [
         word.strip().lower()
         for word in raw_words
         if len(word.strip()) > 2 and word.strip().lower() not in STOP_WORDS
     ]
 
+
+def _searchable_text(product) -> str:
+    return ' '.join([
+        product.name or '',
+        product.description or '',
+        product.brand or '',
+        product.category.name if product.category else '',
+    ]).lower()
+
+
+def _keyword_search(description: str, top_k: int):
+    """
+    Match the catalog against keywords from a vision-model description using
+    the ProductKeyword postings, so only products sharing a keyword are touched.
+    """
+    from products.models import Product, ProductKeyword
+
+    keywords = _extract_keywords(description)
     logger.info('Filtered keywords: %s', keywords)
 
-    if not keywords:
-        return [], description
+    terms = {search_service.fold_term(kw) for kw in keywords}
+    if not terms:
+        return []
 
-    # Score each product by how many keywords match
-    all_products = (
-        Product.objects
-        .filter(is_available=True)
-        .select_related('category')
+    # One indexed lookup: the matched terms of every candidate product
+    matched_terms = defaultdict(set)
+    postings = (
+        ProductKeyword.objects
+        .filter(token__in=terms, product__is_available=True)
+        .values_list('product_id', 'token')
     )
+    for product_id, token in postings:
+        matched_terms[product_id].add(token)
 
+    # Must match at least 40% of keywords AND minimum 2 absolute hits
+    min_required = max(2, int(len(terms) * 0.4))
     scored = []
-    for product in all_products:
-        # Build searchable text blob from all product fields
-        searchable = ' '.join([
-            product.name or '',
-            product.description or '',
-            product.brand or '',
-            product.category.name if product.category else '',
-        ]).lower()
-
-        # Count keyword hits
-        score = sum(1 for kw in keywords if kw in searchable)
-
-        # Must match at least 40% of keywords AND minimum 2 absolute hits
-        min_required = max(2, int(len(keywords) * 0.4))
+    for product_id, tokens in matched_terms.items():
+        score = len(tokens & terms)
         if score >= min_required:
-            scored.append((product, score))
+            scored.append((product_id, score))
 
     # Sort by score descending
     scored.sort(key=lambda x: x[1], reverse=True)
+    top_ids = [product_id for product_id, _score in scored[:top_k]]
+
+    products = Product.objects.select_related('category').in_bulk(top_ids)
+    return [products[pid] for pid in top_ids if pid in products]
 
-    matched_products = [p for p, score in scored[:top_k]]
-    return matched_products, description
+
+def _rerank_with_description(ranked, description: str):
+    """Boost visually similar products whose text also matches the description."""
+    keywords = _extract_keywords(description)
+    if not keywords:
+        return ranked
+
+    weight = float(getattr(settings, 'VISUAL_SEARCH_RERANK_WEIGHT', 0.5))
+    rescored = []
+    for product, similarity in ranked:
+        searchable = _searchable_text(product)
+        overlap = sum(1 for kw in keywords if kw in searchable) / len(keywords)
+        rescored.append((product, similarity + weight * overlap))
+
+    rescored.sort(key=lambda x: x[1], reverse=True)
+    return rescored
+
+
+def find_similar_products(uploaded_image: Image.Image, top_k: int = 6):
     """
-    Use Groq vision to describe the uploaded image then search
-    the product catalog using that description.
+    Find catalog products that look like the uploaded image.
+
+    Uses the local image-embedding index (no network call). When
+    VISUAL_SEARCH_LLM_RERANK is on, the Groq vision description re-ranks
+    the visual candidates; when the index is empty the description-based
+    keyword search is used instead.
     Returns a tuple of (matched_products, search_description)
     """
     from products.models import Product
-    from django.db.models import Q
-
-    description = _describe_image(uploaded_image)
 
-    keywords = [word.strip() for word in description.split() if len(word.strip()) > 2]
+    rerank = getattr(settings, 'VISUAL_SEARCH_LLM_RERANK', False) and GROQ_API_KEY
 
-    if not keywords:
-        return [], description
+    # Over-fetch so unavailable products and re-ranking don't starve the page
+    hits = find_visually_similar(uploaded_image, top_k=top_k, candidates=top_k * 3)
 
-    query = Q()
-    for keyword in keywords:
-        query |= Q(name__icontains=keyword)
-        query |= Q(description__icontains=keyword)
-        query |= Q(brand__icontains=keyword)
-        query |= Q(category__name__icontains=keyword)
+    if not hits:
+        description = describe_image(uploaded_image)
+        logger.info('Groq description: %s', description)
+        return _keyword_search(description, top_k), description
 
     products = (
         Product.objects
         .filter(is_available=True)
-        .filter(query)
         .select_related('category')
-        .distinct()[:top_k]
+        .in_bulk([product_id for product_id, _score in hits])
     )
+    ranked = [(products[pid], score) for pid, score in hits if pid in products]
+
+    description = ''
+    if rerank:
+        try:
+            description = describe_image(uploaded_image)
+            ranked = _rerank_with_description(ranked, description)
+        except (RequestException, KeyError, ValueError) as e:
+            logger.warning('Vision re-rank skipped: %s', e)
 
-    return list(products), description
\ No newline at end of file
+    return [p for p, _score in ranked[:top_k]], description
@@ -1,11 +1,5 @@
-// Predictive Search Suggestions
-const suggestionsEl = document.getElementById('ai-suggestions-data');
-let suggestions = [];
-try {
-  suggestions = suggestionsEl ? JSON.parse(suggestionsEl.textContent || '[]') : [];
-} catch (e) {
-  suggestions = [];
-}
+// Predictive Search Suggestions (served by the typeahead endpoint)
+const SUGGEST_DEBOUNCE_MS = 80;
 
 const visualCountEl = document.getElementById('ai-visual-result-count');
 let visualResultCount = 0;
@@ -23,31 +17,66 @@ if (!textInput || !suggestionBox || !suggestionList) {
   // Page does not include the AI search UI
 } else {
 
-  textInput.addEventListener('input', function () {
-    const query = this.value.toLowerCase().trim();
+  const suggestUrl = textInput.dataset.suggestUrl;
+  let suggestTimer = null;
+  let suggestController = null;
 
-    if (query.length < 2) {
-      suggestionBox.classList.add('hidden');
+  function renderSuggestions(items) {
+    suggestionList.innerHTML = '';
+
+    if (items.length === 0) {
+      suggestionList.innerHTML = `<div class="px-6 py-3 text-gray-500">No suggestions found</div>`;
       return;
     }
 
-    const filtered = suggestions.filter(item => item.toLowerCase().includes(query));
+    items.forEach(item => {
+      const row = document.createElement('div');
+      row.className = 'search-suggestion px-6 py-3 flex items-center justify-between cursor-pointer';
+      row.innerHTML = `
+        <span class="flex items-center gap-3">
+          <i class="fas fa-search text-pink-500"></i>
+          <span class="suggestion-text"></span>
+        </span>
+        <span class="text-xs text-gray-400 capitalize">${item.kind}</span>
+      `;
+      row.querySelector('.suggestion-text').textContent = item.text;
+      row.addEventListener('click', () => selectSuggestion(item.text));
+      suggestionList.appendChild(row);
+    });
+  }
 
-    if (filtered.length === 0) {
-      suggestionList.innerHTML = `<div class="px-6 py-3 text-gray-500">No suggestions found</div>`;
-    } else {
-      suggestionList.innerHTML = filtered.map(item => `
-        <div class="search-suggestion px-6 py-3 flex items-center justify-between cursor-pointer" onclick="selectSuggestion('${item}')">
-          <span class="flex items-center gap-3">
-            <i class="fas fa-search text-pink-500"></i>
-            ${item}
-          </span>
-          <i class="fas fa-arrow-up-right-from-square text-gray-400"></i>
-        </div>
-      `).join('');
+  function fetchSuggestions(query) {
+    if (suggestController) {
+      suggestController.abort();
+    }
+    suggestController = new AbortController();
+
+    fetch(`${suggestUrl}?q=${encodeURIComponent(query)}`, { signal: suggestController.signal })
+      .then(response => response.json())
+      .then(data => {
+        if (textInput.value.toLowerCase().trim() !== query) {
+          return;
+        }
+        renderSuggestions(data.suggestions || []);
+        suggestionBox.classList.remove('hidden');
+      })
+      .catch(err => {
+        if (err.name !== 'AbortError') {
+          console.error('Suggestion request failed:', err);
+        }
+      });
+  }
+
+  textInput.addEventListener('input', function () {
+    const query = this.value.toLowerCase().trim();
+    clearTimeout(suggestTimer);
+
+    if (query.length < 2 || !suggestUrl) {
+      suggestionBox.classList.add('hidden');
+      return;
     }
 
-    suggestionBox.classList.remove('hidden');
+    suggestTimer = setTimeout(() => fetchSuggestions(query), SUGGEST_DEBOUNCE_MS);
   });
 
   // Select suggestion
@@ -1,111 +1,135 @@
-let cart = JSON.parse(localStorage.getItem('ahyera_cart')) || [];
-
-// Update Header Count
-function updateHeaderCount() {
-  const count = cart.reduce((sum, item) => sum + (item.quantity || 1), 0);
-  document.getElementById('cart-count-header').textContent = count;
-  document.getElementById('cart-count-header').style.display = count > 0 ? 'flex' : 'none';
-}
-
-// Show Toast Notification
-function showToast(message) {
-  const toast = document.getElementById('toast');
-  document.getElementById('toast-message').textContent = message;
-  toast.classList.remove('hidden', 'translate-y-20');
-  toast.classList.add('translate-y-0');
-  setTimeout(() => {
-    toast.classList.add('translate-y-20');
-    setTimeout(() => toast.classList.add('hidden'), 300);
-  }, 3000);
-}
-
-// Render Cart Items
-function renderCart() {
-  const container = document.getElementById('cart-items');
-  const empty = document.getElementById('empty-cart');
-  const summary = document.getElementById('cart-summary');
-
-  if (cart.length === 0) {
-    empty.classList.remove('hidden');
-    summary.classList.add('hidden');
-    container.innerHTML = '';
-    updateHeaderCount();
-    return;
+// Cart page: quantity clicks are applied to the page at once and sent to the
+// server as one batch after a short pause
+const CART_BATCH_DELAY_MS = 400;
+
+const cartPage = document.getElementById('cart-page');
+const batchUrl = cartPage ? cartPage.dataset.batchUrl : null;
+
+function getCookie(name) {
+  let cookieValue = null;
+  if (document.cookie && document.cookie !== '') {
+    const cookies = document.cookie.split(';');
+    for (let i = 0; i < cookies.length; i++) {
+      const cookie = cookies[i].trim();
+      if (cookie.substring(0, name.length + 1) === (name + '=')) {
+        cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+        break;
+      }
+    }
   }
+  return cookieValue;
+}
+const csrftoken = getCookie('csrftoken');
 
-  empty.classList.add('hidden');
-  summary.classList.remove('hidden');
-
-  container.innerHTML = cart.map((item, index) => {
-    const qty = item.quantity || 1;
-    const itemTotal = item.price * qty;
-
-    return `
-      <div class="bg-white rounded-2xl shadow-md p-6 flex flex-col md:flex-row gap-6 border">
-        <img src="${item.image}" class="w-32 h-32 object-cover rounded-xl">
-
-        <div class="flex-1">
-          <h3 class="text-xl font-bold">${item.name}</h3>
-          <p class="text-gray-600">Size: <span class="font-semibold">${item.size || 'Standard'}</span></p>
-          <p class="text-2xl font-bold text-pink-600 mt-3">PKR ${item.price.toLocaleString()}</p>
-        </div>
+const pendingDeltas = new Map();
+let flushTimer = null;
+let inFlight = false;
 
-        <!-- Quantity Controls -->
-        <div class="flex items-center gap-4">
-          <button onclick="updateQuantity(${index}, -1)" class="w-12 h-12 bg-gray-200 rounded-full hover:bg-gray-300 text-xl font-bold">-</button>
-          <span class="text-2xl font-bold w-16 text-center">${qty}</span>
-          <button onclick="updateQuantity(${index}, 1)" class="w-12 h-12 bg-gray-200 rounded-full hover:bg-gray-300 text-xl font-bold">+</button>
-        </div>
+function updateSummary(data) {
+  document.getElementById('summary-count').textContent = data.cart_count;
+  document.getElementById('summary-subtotal').textContent = parseFloat(data.cart_total).toFixed(0);
+  document.getElementById('summary-total').textContent = parseFloat(data.cart_total).toFixed(0);
+  if (data.cart_count === 0) location.reload(); // Reload to show empty state
+}
 
-        <div class="text-right">
-          <p class="text-xl font-bold text-pink-600">PKR ${itemTotal.toLocaleString()}</p>
-          <button onclick="removeFromCart(${index})" class="mt-4 text-red-600 hover:text-red-800">
-            <i class="fas fa-trash text-xl"></i> Remove
-          </button>
-        </div>
-      </div>
-    `;
-  }).join('');
+function applyCartState(data) {
+  data.removed.forEach(itemId => {
+    const row = document.getElementById(`cart-item-${itemId}`);
+    if (row) row.remove();
+  });
+  data.items.forEach(item => {
+    // Clicks made while this batch was in flight are still pending
+    const pending = pendingDeltas.get(String(item.id)) || 0;
+    const qty = document.getElementById(`qty-${item.id}`);
+    if (qty) qty.textContent = Math.max(item.quantity + pending, 0);
+    const total = document.getElementById(`item-total-${item.id}`);
+    if (total) total.textContent = parseFloat(item.item_total).toFixed(0);
+  });
+  updateSummary(data);
+  if (data.messages.length) alert(data.messages.join('\n'));
+}
 
-  updateTotal();
-  updateHeaderCount();
+function flushCart() {
+  flushTimer = null;
+  if (inFlight || pendingDeltas.size === 0) return;
+
+  const operations = Array.from(pendingDeltas, ([itemId, delta]) => ({ item_id: itemId, delta: delta }));
+  pendingDeltas.clear();
+  inFlight = true;
+
+  fetch(batchUrl, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-CSRFToken': csrftoken,
+    },
+    body: JSON.stringify({ operations: operations })
+  })
+    .then(response => response.json())
+    .then(data => {
+      if (data.success) {
+        applyCartState(data);
+      } else {
+        alert(data.message);
+        location.reload();
+      }
+    })
+    .catch(() => location.reload())
+    .finally(() => {
+      inFlight = false;
+      if (pendingDeltas.size) flushCart();
+    });
 }
 
 // Update Quantity
-window.updateQuantity = function(index, change) {
-  const item = cart[index];
-  const newQty = (item.quantity || 1) + change;
+function updateCart(itemId, change) {
+  const key = String(itemId);
+  const qty = document.getElementById(`qty-${key}`);
+  const shown = parseInt(qty.textContent, 10);
+  if (shown + change < 0) return;
 
-  if (newQty <= 0) {
-    if (confirm("Remove this item from cart?")) {
-      cart.splice(index, 1);
-      showToast("Item removed from cart!");
-    } else {
-      return;
-    }
-  } else {
-    item.quantity = newQty;
-  }
+  qty.textContent = shown + change;
+  pendingDeltas.set(key, (pendingDeltas.get(key) || 0) + change);
 
-  localStorage.setItem('ahyera_cart', JSON.stringify(cart));
-  renderCart();
-};
+  clearTimeout(flushTimer);
+  flushTimer = setTimeout(flushCart, CART_BATCH_DELAY_MS);
+}
 
 // Remove Item
-window.removeFromCart = function(index) {
-  if (confirm("Are you sure you want to remove this item?")) {
-    cart.splice(index, 1);
-    localStorage.setItem('ahyera_cart', JSON.stringify(cart));
-    showToast("Item removed successfully!");
-    renderCart();
-  }
-};
-
-// Update Total Price
-function updateTotal() {
-  const total = cart.reduce((sum, item) => sum + (item.price * (item.quantity || 1)), 0);
-  document.getElementById('total-price').textContent = `PKR ${total.toLocaleString()}`;
+function removeCartItem(itemId) {
+  if (!confirm('Are you sure you want to remove this item?')) return;
+  pendingDeltas.delete(String(itemId));
+
+  fetch(`/customers/cart/remove/${itemId}/`, {
+    method: 'POST',
+    headers: {
+      'X-CSRFToken': csrftoken,
+    }
+  })
+    .then(response => response.json())
+    .then(data => {
+      if (data.success) {
+        document.getElementById(`cart-item-${itemId}`).remove();
+        updateSummary(data);
+      }
+    });
 }
 
-// Initial Load
-renderCart();
\ No newline at end of file
+// Clear Cart
+function clearCart() {
+  if (!confirm('Are you sure you want to clear your entire cart?')) return;
+  pendingDeltas.clear();
+
+  fetch(`/customers/cart/clear/`, {
+    method: 'POST',
+    headers: {
+      'X-CSRFToken': csrftoken,
+    }
+  })
+    .then(response => response.json())
+    .then(data => {
+      if (data.success) {
+        location.reload();
+      }
+    });
+}
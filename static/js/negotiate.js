@@ -0,0 +1,37 @@
+// Poll the negotiation status while an offer is being decided in the background
+const NEGOTIATE_POLL_MS = 1500;
+const NEGOTIATE_MAX_POLLS = 120;
+
+const latestDecision = document.getElementById('latest-decision');
+const statusUrl = latestDecision ? latestDecision.dataset.statusUrl : null;
+
+if (statusUrl) {
+  let polls = 0;
+
+  function pollStatus() {
+    polls += 1;
+
+    fetch(statusUrl, { headers: { 'Accept': 'application/json' }, credentials: 'same-origin' })
+      .then(response => (response.ok ? response.json() : null))
+      .then(data => {
+        if (data && !data.pending) {
+          if (data.redirect_url) {
+            window.location.href = data.redirect_url;
+          } else {
+            window.location.reload();
+          }
+          return;
+        }
+        if (polls < NEGOTIATE_MAX_POLLS) {
+          setTimeout(pollStatus, NEGOTIATE_POLL_MS);
+        }
+      })
+      .catch(() => {
+        if (polls < NEGOTIATE_MAX_POLLS) {
+          setTimeout(pollStatus, NEGOTIATE_POLL_MS * 2);
+        }
+      });
+  }
+
+  setTimeout(pollStatus, NEGOTIATE_POLL_MS);
+}